@@ -1,231 +1,264 @@
 import json
 import os
-import re
-import subprocess
-import requests
-from collections import Counter, defaultdict
+import sys
 from datetime import datetime
 
-def extract_json_objects(text):
-    """
-    Extrait des objets JSON contenus dans une chaîne texte.
-    """
-    try:
-        # Essayer de charger tout le fichier JSON en une seule fois
-        json_data = json.loads(text)
-        # Si le JSON contient une clé 'walletOperations', on suppose qu'il y a plusieurs objets à traiter
-        if 'walletOperations' in json_data:
-            return json_data['walletOperations']
-        else:
-            print("Aucun objet trouvé dans 'walletOperations'.")
-            return []
-    except json.JSONDecodeError as e:
-        print(f"Erreur JSON : {e}")
-        return []
+from saver import load_stations, get_station_info
+from store import operation_key, load_state, open_trips, stored_keys, is_new, append_trips, reset_store
+from stream import iter_wallet_operations
+from stats_engine import compute_stats
+
+# Version du document statistiques.json lu par stats.py et web-maker.py
+STATS_VERSION = 1
+DURATION_HISTOGRAM_EDGES = [5, 10, 15, 20, 30, 45, 60]
 
 def parse_iso8601(date_str):
     return datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%SZ")
 
-def get_station_names():
-    url = "https://velib-metropole-opendata.smovengo.cloud/opendata/Velib_Metropole/station_information.json"
-    response = requests.get(url)
-    info_data = response.json()
-
-    station_dict = {}
-    for station in info_data["data"]["stations"]:
-        station_id = str(station["station_id"])
-        station_name = station.get("name", f"Station {station_id}")
-        station_dict[station_id] = station_name
-    return station_dict
-
-def main():
-    if os.path.exists("../data/coordonnees.csv"):
-        os.remove("../data/coordonnees.csv")
-        print("Fichier 'coordonnees.csv' supprimé.\n")
-
-    print("Chargement de data.txt...")
-    with open('data.txt', 'r', encoding='utf-8') as f:
-        content = f.read()
-
-    # Affiche les 500 premiers caractères du fichier pour vérifier son contenu
-    print("Contenu de data.txt (500 premiers caractères) :")
-    print(content[:500])  # Affiche les 500 premiers caractères du fichier
-
-    # Extraction des objets JSON dans 'walletOperations'
-    raw_objects = extract_json_objects(content)
-    print(f"{len(raw_objects)} objets extraits\n")
+def parse_operation(obj, stations):
+    """
+    Transforme une walletOperation en enregistrement du magasin de trajets.
+    Renvoie None si l'opération n'est pas un trajet exploitable.
+    """
+    start = obj.get('startDate')
+    end = obj.get('endDate')
+    if not (start and end):
+        return None
+    # Validation des dates avant enregistrement
+    parse_iso8601(start)
+    parse_iso8601(end)
+
+    p3 = obj.get('parameter3', {})
+    departure = p3.get('departureStationId')
+    arrival = p3.get('arrivalStationId')
+    avg_speed = p3.get('AVERAGE_SPEED')
+
+    # Résolution des coordonnées en mémoire (plus de sous-processus saver.py)
+    coords = None
+    start_info = get_station_info(stations, departure)
+    end_info = get_station_info(stations, arrival)
+    if start_info and end_info:
+        coords = [start_info[1], start_info[2], end_info[1], end_info[2]]
+
+    return {
+        'key': operation_key(obj),
+        'start': start,
+        'end': end,
+        'departure': departure,
+        'arrival': arrival,
+        'bike': p3.get('BIKEID'),
+        'distance': float(p3.get('DISTANCE', 0)),
+        'speed': float(avg_speed) if avg_speed is not None else None,
+        'bonus': float(p3.get('BONUS_EARNED', 0)),
+        'coords': coords,
+    }
 
-    if len(raw_objects) == 0:
-        print("Aucun objet JSON valide n'a été extrait.")
-        return
-
-    station_counter = Counter()
-    trajet_durations = []
-    trajet_speeds = []
-    bike_counter = Counter()
-    boomerang_count = 0
-    total_bonus = 0.0
-    total_distance = 0.0
-    trajets_count = 0
-    trajets_with_bonus = 0
-    trajets_electric = 0
-    trajets_mechanical = 0
-
-    station_names = get_station_names()
-
-    trajets_per_hour = defaultdict(int)
-    trajets_per_day = defaultdict(int)
-
-    for i, obj in enumerate(raw_objects, start=1):
+def select_new(operations, seen_keys, watermark):
+    """Ne laisse passer que les opérations jamais vues (filigrane + identifiant stable)."""
+    for obj in operations:
+        key = operation_key(obj)
+        if is_new(obj, key, seen_keys, watermark):
+            seen_keys.add(key)
+            yield obj
+
+def resolve(operations, stations):
+    """Transforme les opérations en trajets avec coordonnées des stations."""
+    for i, obj in enumerate(operations, start=1):
         try:
-            p3 = obj.get('parameter3', {})
-            departure = p3.get('departureStationId')
-            arrival = p3.get('arrivalStationId')
-            bikeid = p3.get('BIKEID')
-            bonus_earned = float(p3.get('BONUS_EARNED', 0))
-            distance = float(p3.get('DISTANCE', 0))
-            avg_speed = p3.get('AVERAGE_SPEED')
-            avg_speed = float(avg_speed) if avg_speed is not None else None
-
-            start = obj.get('startDate')
-            end = obj.get('endDate')
-            if start and end:
-                try:
-                    start_dt = parse_iso8601(start)
-                    end_dt = parse_iso8601(end)
-                except Exception as e:
-                    print(f"[{i}] Erreur parsing dates : {e}")
-                    continue
-
-                duration_sec = (end_dt - start_dt).total_seconds()
-                trajets_count += 1
-
-                if departure:
-                    station_counter[departure] += 1
-                if arrival:
-                    station_counter[arrival] += 1
-
-                trajet_durations.append((duration_sec, departure, arrival))
-                if avg_speed is not None:
-                    trajet_speeds.append((avg_speed, departure, arrival))
-
-                if bikeid:
-                    bike_counter[bikeid] += 1
-                    try:
-                        if int(bikeid) < 50000:
-                            trajets_electric += 1
-                        else:
-                            trajets_mechanical += 1
-                    except ValueError:
-                        pass
-
-                if duration_sec < 60:
-                    boomerang_count += 1
-
-                total_bonus += bonus_earned
-                if bonus_earned > 0:
-                    trajets_with_bonus += 1
-
-                total_distance += distance
-
-                # Lancement de saver.py comme demandé
-                cmd = ['python3', 'saver.py', str(departure), str(arrival)]
-                print(f"[{i}] Lancement : {' '.join(cmd)}")
-                subprocess.run(cmd)
-
-                trajets_per_hour[start_dt.hour] += 1
-                trajets_per_day[start_dt.date()] += 1
-
-                if trajets_count % 10 == 0 or trajets_count == len(raw_objects):
-                    percent = (trajets_count / len(raw_objects)) * 100
-                    print(f"Trajets traités : {trajets_count}/{len(raw_objects)} ({percent:.1f}%)")
-
+            record = parse_operation(obj, stations)
         except Exception as e:
             print(f"Erreur dans le traitement de l'objet #{i}: {e}")
             continue
+        if record is not None:
+            yield record
 
-    avg_duration_min = (sum(d for d, _, _ in trajet_durations) / len(trajet_durations) / 60) if trajet_durations else 0
-    avg_speed_global = (sum(s for s, _, _ in trajet_speeds) / len(trajet_speeds)) if trajet_speeds else 0
-    avg_distance_km = (total_distance / trajets_count / 1000) if trajets_count else 0
+def ingest(operations, stations, data_dir="../data", batch_size=1000):
+    """
+    Pipeline de générateurs : opérations -> nouvelles opérations -> trajets résolus,
+    enregistrés par lots dans le magasin. Renvoie le nombre de nouveaux trajets.
+    """
+    store_path, state_path = _data_paths(data_dir)
+    state = load_state(state_path)
+    seen_keys = stored_keys(store_path)
+
+    new_count = 0
+    batch = []
+    trips = resolve(select_new(operations, seen_keys, state.get("watermark")), stations)
+    for record in trips:
+        batch.append(record)
+        if len(batch) < batch_size:
+            continue
+        state = append_trips(batch, state, store_path, state_path)
+        new_count += len(batch)
+        batch = []
+    state = append_trips(batch, state, store_path, state_path)
+    new_count += len(batch)
+
+    print(f"✅ {new_count} nouveaux trajets ajoutés à {os.path.basename(store_path)}\n")
+    return new_count
+
+def _data_paths(data_dir):
+    return (
+        os.path.join(data_dir, "trajets.npy"),
+        os.path.join(data_dir, "trajets.state.json"),
+    )
+
+def analyze(data_file="data.txt", data_dir="../data", output_dir="../output", rebuild=False, verbose=True):
+    """
+    Ingère un export data.txt puis écrit les statistiques dans output_dir.
+    Renvoie les agrégats partiels du compte (voir batch.py pour la fusion).
+    """
+    store_path, state_path = _data_paths(data_dir)
+    if rebuild:
+        reset_store(store_path, state_path)
+        print("Magasin de trajets supprimé.\n")
+
+    print(f"Lecture en flux de {data_file}...")
+    if verbose:
+        with open(data_file, 'r', encoding='utf-8') as f:
+            # Affiche les 500 premiers caractères du fichier pour vérifier son contenu
+            print(f"Contenu de {data_file} (500 premiers caractères) :")
+            print(f.read(500))
+
+    # Index des stations construit une seule fois pour tout le run
+    stations = load_stations()
+    station_names = {sid: name or f"Station {sid}" for sid, (name, _, _) in stations.items()}
+
+    ingest(iter_wallet_operations(data_file), stations, data_dir)
+    if load_state(state_path).get("count", 0) == 0:
+        print("Aucun objet JSON valide n'a été extrait.")
+        return None
 
-    duration_bins = {
-        "<5 min": 0,
-        "5-10 min": 0,
-        "10-20 min": 0,
-        "20-30 min": 0,
-        ">30 min": 0
+    stats = compute_stats(open_trips(store_path))
+    write_report(stats, station_names, os.path.join(output_dir, "statistiques.txt"))
+    with open(os.path.join(output_dir, "statistiques.json"), "w", encoding="utf-8") as f:
+        json.dump(stats_document(stats, station_names), f, ensure_ascii=False, indent=2)
+    print("✅ Analyse terminée ! 🚴‍♂️ Merci pour les données ! 📊")
+
+    # Agrégats partiels, fusionnables d'un compte à l'autre sans retraitement
+    return {
+        'trips': stats['trips'],
+        'distance': stats['total_distance'],
+        'bonus': stats['total_bonus'],
+        'stations': dict(stats['stations']),
+        'bikes': dict(stats['bikes']),
+        'hours': {str(hour): count for hour, count in stats['hours'].items()},
+        'days': {str(day): count for day, count in stats['days'].items()},
+        'durations': stats['duration_bins'],
+        'longest': stats['longest'].to_dict(),
+        'fastest': stats['fastest'].to_dict(),
+        'sketches': {name: sketch.to_dict() for name, sketch in stats['sketches'].items()},
+    }
+
+def stats_document(stats, station_names):
+    """Document structuré et versionné des statistiques (output/statistiques.json)."""
+    def name(station):
+        return station_names.get(str(station), f"Station {station}")
+
+    trajets_count = stats['trips']
+    return {
+        'version': STATS_VERSION,
+        'total_trips': trajets_count,
+        'total_bikes': len(stats['bikes']),
+        'electric_bikes': stats['electric_bikes'],
+        'mechanical_bikes': stats['mechanical_bikes'],
+        'electric_trips': stats['electric_trips'],
+        'mechanical_trips': stats['mechanical_trips'],
+        'boomerang_trips': stats['boomerang_trips'],
+        'bonus_trips': stats['bonus_trips'],
+        'bonus_minutes': stats['total_bonus'],
+        'total_distance_km': stats['total_distance'] / 1000,
+        'avg_distance_km': stats['avg_distance_km'],
+        'avg_duration_min': stats['avg_duration_min'],
+        'avg_speed_kmh': stats['avg_speed'],
+        'top_stations': [
+            {'name': name(station), 'id': str(station), 'count': count}
+            for station, count in stats['stations'][:10]
+        ],
+        'long_trips': [
+            {'from': name(dep), 'to': name(arr), 'duration_min': round(duration / 60, 2)}
+            for duration, dep, arr in stats['longest'].items()
+        ],
+        'fast_trips': [
+            {'from': name(dep), 'to': name(arr), 'speed': round(speed, 2)}
+            for speed, dep, arr in stats['fastest'].items()
+        ],
+        'top_bikes': [{'id': str(bikeid), 'count': count} for bikeid, count in stats['bikes'][:10]],
+        'duration_counts': {label.replace(" ", ""): count for label, count in stats['duration_bins'].items()},
+        'duration_distribution': {
+            label.replace(" ", ""): (count / trajets_count * 100) if trajets_count else 0
+            for label, count in stats['duration_bins'].items()
+        },
+        'hourly_trips': [{'hour': f'{hour:02d}h', 'trips': count} for hour, count in sorted(stats['hours'].items())],
+        'quantiles': {name: sketch.quantiles() for name, sketch in stats['sketches'].items()},
+        'duration_histogram': {
+            'edges_min': DURATION_HISTOGRAM_EDGES,
+            'counts': stats['sketches']['duration_min'].histogram(DURATION_HISTOGRAM_EDGES),
+        },
+        'daily_trips': [{'day': str(day), 'trips': count} for day, count in sorted(stats['days'].items())],
     }
-    for duration_sec, _, _ in trajet_durations:
-        minutes = duration_sec / 60
-        if minutes < 5:
-            duration_bins["<5 min"] += 1
-        elif minutes < 10:
-            duration_bins["5-10 min"] += 1
-        elif minutes < 20:
-            duration_bins["10-20 min"] += 1
-        elif minutes < 30:
-            duration_bins["20-30 min"] += 1
-        else:
-            duration_bins[">30 min"] += 1
-
-    with open("../output/statistiques.txt", "w", encoding="utf-8") as out:
+
+def write_report(stats, station_names, path):
+    """Écrit le rapport texte lisible (statistiques.txt)."""
+    trajets_count = stats['trips']
+    with open(path, "w", encoding="utf-8") as out:
         out.write("--- Statistiques ---\n\n")
 
         out.write("Top 10 stations (départ + arrivée) :\n")
-        for station, count in station_counter.most_common(10):
+        for station, count in stats['stations'][:10]:
             name = station_names.get(str(station), f"Station {station}")
             out.write(f"{name} ({station}) : {count} passages\n")
         out.write("\n")
 
         out.write("Top 10 trajets les plus longs (en minutes) :\n")
-        for duration, dep, arr in sorted(trajet_durations, reverse=True)[:10]:
+        for duration, dep, arr in stats['longest'].items():
             dep_name = station_names.get(str(dep), f"Station {dep}")
             arr_name = station_names.get(str(arr), f"Station {arr}")
             out.write(f"{dep_name} -> {arr_name} : {duration / 60:.2f} min\n")
         out.write("\n")
 
         out.write("Top 10 trajets les plus rapides (vitesse moyenne en km/h) :\n")
-        for speed, dep, arr in sorted(trajet_speeds, reverse=True)[:10]:
+        for speed, dep, arr in stats['fastest'].items():
             dep_name = station_names.get(str(dep), f"Station {dep}")
             arr_name = station_names.get(str(arr), f"Station {arr}")
             out.write(f"{dep_name} -> {arr_name} : {speed:.2f} km/h\n")
         out.write("\n")
 
         out.write("Top 10 vélos les plus utilisés :\n")
-        for bikeid, count in bike_counter.most_common(10):
+        for bikeid, count in stats['bikes'][:10]:
             out.write(f"Vélo {bikeid} : {count} trajets\n")
         out.write("\n")
 
-        electric_count = sum(1 for bikeid in bike_counter if int(bikeid) < 50000)
-        mechanical_count = len(bike_counter) - electric_count
-        out.write(f"Nombre total de vélos électriques : {electric_count}\n")
-        out.write(f"Nombre total de vélos mécaniques : {mechanical_count}\n")
+        out.write(f"Nombre total de vélos électriques : {stats['electric_bikes']}\n")
+        out.write(f"Nombre total de vélos mécaniques : {stats['mechanical_bikes']}\n")
         out.write("\n")
 
+        trajets_with_bonus = stats['bonus_trips']
         out.write(f"Nombre de trajets avec bonus : {trajets_with_bonus} ({(trajets_with_bonus / trajets_count * 100) if trajets_count else 0:.2f}%)\n")
-        out.write(f"Bonus total gagné : {total_bonus:.2f}\n")
-        out.write(f"Distance parcourue au total (en km) : {total_distance / 1000:.2f}\n")
-        out.write(f"Durée moyenne d'un trajet : {avg_duration_min:.2f} minutes\n")
-        out.write(f"Vitesse moyenne globale : {avg_speed_global:.2f} km/h\n")
-        out.write(f"Distance moyenne par trajet : {avg_distance_km:.2f} km\n")
+        out.write(f"Bonus total gagné : {stats['total_bonus']:.2f}\n")
+        out.write(f"Distance parcourue au total (en km) : {stats['total_distance'] / 1000:.2f}\n")
+        out.write(f"Durée moyenne d'un trajet : {stats['avg_duration_min']:.2f} minutes\n")
+        out.write(f"Vitesse moyenne globale : {stats['avg_speed']:.2f} km/h\n")
+        out.write(f"Distance moyenne par trajet : {stats['avg_distance_km']:.2f} km\n")
         out.write("\n")
 
         out.write("Répartition des durées des trajets :\n")
-        for bin_range, count in duration_bins.items():
+        for bin_range, count in stats['duration_bins'].items():
             out.write(f"{bin_range} : {count}\n")
         out.write("\n")
 
         out.write("Répartition des trajets par heure :\n")
-        for hour, count in sorted(trajets_per_hour.items()):
+        for hour, count in sorted(stats['hours'].items()):
             out.write(f"{hour}:00 - {hour+1}:00 : {count}\n")
         out.write("\n")
 
         out.write("Répartition des trajets par jour :\n")
-        for day, count in sorted(trajets_per_day.items()):
+        for day, count in sorted(stats['days'].items()):
             out.write(f"{day} : {count}\n")
         out.write("\n")
 
-    print("✅ Analyse terminée ! 🚴‍♂️ Merci pour les données ! 📊")
+def main():
+    analyze(rebuild="--rebuild" in sys.argv)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+import time
+import requests
+
+# URL de l'API
+INFO_URL = "https://velib-metropole-opendata.smovengo.cloud/opendata/Velib_Metropole/station_information.json"
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cache")
+INDEX_FILE = os.path.join(CACHE_DIR, "stations-index.json")
+CATALOG_VERSION = 1
+DEFAULT_TTL = 24 * 3600  # secondes
+
+def http_fetcher(url=INFO_URL, timeout=10, retries=3, backoff=1.0):
+    """
+    Fetcher HTTP avec timeout et nouvelles tentatives.
+    Renvoie une fonction headers -> (status, contenu, headers de réponse).
+    """
+    def fetch(headers):
+        for attempt in range(1, retries + 1):
+            try:
+                response = requests.get(url, headers=headers, timeout=timeout)
+                if response.status_code == 304:
+                    return 304, None, response.headers
+                response.raise_for_status()
+                return response.status_code, response.content, response.headers
+            except requests.RequestException as e:
+                if attempt == retries:
+                    raise
+                print(f"⚠️ Tentative {attempt}/{retries} échouée ({e}), nouvel essai...")
+                time.sleep(backoff * 2 ** (attempt - 1))
+    fetch.source = url
+    return fetch
+
+def file_fetcher(path):
+    """Fetcher local : lit un fichier station_information.json de remplacement."""
+    def fetch(headers):
+        mtime = str(os.path.getmtime(path))
+        if headers.get("If-Modified-Since") == mtime:
+            return 304, None, {}
+        with open(path, "rb") as f:
+            return 200, f.read(), {"Last-Modified": mtime}
+    fetch.source = path
+    return fetch
+
+def make_fetcher(source=None):
+    """Choisit le fetcher selon la source (URL ou chemin local, VELIB_STATION_SOURCE par défaut)."""
+    source = source or os.environ.get("VELIB_STATION_SOURCE") or INFO_URL
+    if source.startswith(("http://", "https://")):
+        return http_fetcher(source)
+    return file_fetcher(source)
+
+def _snapshot_path(digest):
+    return os.path.join(CACHE_DIR, f"stations-{digest[:16]}.json")
+
+def _read_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_json(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+
+def _compact(raw):
+    """Ne garde que les champs utiles : [id, nom, lat, lon, capacité]."""
+    info_data = json.loads(raw)
+    return [
+        [str(s["station_id"]), s.get("name"), s.get("lat"), s.get("lon"), s.get("capacity")]
+        for s in info_data["data"]["stations"]
+    ]
+
+def _load_snapshot(index):
+    if not index or index.get("version") != CATALOG_VERSION:
+        return None
+    snapshot = _read_json(_snapshot_path(index["sha256"]))
+    return snapshot["stations"] if snapshot else None
+
+def load_catalog(offline=None, ttl=DEFAULT_TTL, fetcher=None):
+    """
+    Renvoie la liste compacte des stations [id, nom, lat, lon, capacité].
+    L'instantané de cache/ est réutilisé tant que le TTL n'est pas dépassé,
+    puis revalidé par requête conditionnelle (ETag / Last-Modified).
+    En mode hors ligne (VELIB_OFFLINE=1), aucun appel réseau n'est fait.
+    """
+    if offline is None:
+        offline = os.environ.get("VELIB_OFFLINE", "") not in ("", "0")
+    index = _read_json(INDEX_FILE)
+    stations = _load_snapshot(index)
+
+    if offline:
+        if stations is None:
+            raise RuntimeError("Mode hors ligne : aucun instantané des stations dans cache/.")
+        return stations
+    if stations is not None and time.time() - index["fetched_at"] < ttl:
+        return stations
+
+    fetcher = fetcher or make_fetcher()
+    headers = {}
+    if stations is not None:
+        if index.get("etag"):
+            headers["If-None-Match"] = index["etag"]
+        if index.get("last_modified"):
+            headers["If-Modified-Since"] = index["last_modified"]
+
+    try:
+        status, raw, response_headers = fetcher(headers)
+    except Exception as e:
+        if stations is None:
+            raise
+        print(f"⚠️ Catalogue des stations injoignable ({e}), utilisation de l'instantané local.")
+        return stations
+
+    if status == 304:
+        index["fetched_at"] = time.time()
+        _write_json(INDEX_FILE, index)
+        return stations
+
+    digest = hashlib.sha256(raw).hexdigest()
+    if stations is None or digest != index["sha256"]:
+        stations = _compact(raw)
+        _write_json(_snapshot_path(digest), {"version": CATALOG_VERSION, "stations": stations})
+    _write_json(INDEX_FILE, {
+        "version": CATALOG_VERSION,
+        "source": getattr(fetcher, "source", None),
+        "fetched_at": time.time(),
+        "sha256": digest,
+        "etag": response_headers.get("ETag"),
+        "last_modified": response_headers.get("Last-Modified"),
+    })
+    return stations
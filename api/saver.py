@@ -1,45 +1,42 @@
-import requests
 import sys
-import csv
-import os
 
-# Vérifie les arguments
-if len(sys.argv) != 3:
-    print("❌ Utilisation : python3 save.py <start_station_id> <end_station_id>")
-    sys.exit(1)
+from catalog import load_catalog
 
-start_id = sys.argv[1]
-end_id = sys.argv[2]
-
-# URL de l'API
-info_url = "https://velib-metropole-opendata.smovengo.cloud/opendata/Velib_Metropole/station_information.json"
-info_data = requests.get(info_url).json()
+def load_stations(catalog=None):
+    """
+    Construit l'index des stations : station_id -> (nom, lat, lon).
+    Le catalogue est lu une seule fois (instantané local de cache/ si disponible).
+    """
+    if catalog is None:
+        catalog = load_catalog()
+    return {station_id: (name, lat, lon) for station_id, name, lat, lon, _ in catalog}
 
 # Fonction pour extraire les coordonnées et le nom d'une station
-def get_station_info(station_id):
-    station = next((s for s in info_data["data"]["stations"] if str(s["station_id"]) == station_id), None)
-    if station:
-        return station.get("name"), station.get("lat"), station.get("lon")
-    else:
+def get_station_info(stations, station_id):
+    station = stations.get(str(station_id))
+    if station is None:
         print(f"❌ Station avec ID {station_id} non trouvée.")
-        sys.exit(1)
+    return station
 
-# Récupère infos de chaque station
-name_start, lat_start, lon_start = get_station_info(start_id)
-name_end, lat_end, lon_end = get_station_info(end_id)
+def main():
+    # Vérifie les arguments
+    if len(sys.argv) != 3:
+        print("❌ Utilisation : python3 saver.py <start_station_id> <end_station_id>")
+        sys.exit(1)
 
-# 🖨️ Affiche les noms des stations
-print(f"🚲 Station de départ : {name_start}")
-print(f"🏁 Station d'arrivée : {name_end}")
+    stations = load_stations()
 
-# 📄 Écriture dans le fichier CSV (mode ajout)
-file_path = "../data/coordonnees.csv"
-file_exists = os.path.isfile(file_path)
+    # Récupère infos de chaque station
+    start = get_station_info(stations, sys.argv[1])
+    end = get_station_info(stations, sys.argv[2])
+    if start is None or end is None:
+        sys.exit(1)
+    name_start, lat_start, lon_start = start
+    name_end, lat_end, lon_end = end
 
-with open(file_path, mode="a", newline="") as csvfile:
-    writer = csv.writer(csvfile, delimiter=',')
-    if not file_exists or os.stat(file_path).st_size == 0:
-        writer.writerow(["lat_start", "lon_start", "lat_end", "lon_end"])
-    writer.writerow([lat_start, lon_start, lat_end, lon_end])
+    # 🖨️ Affiche les noms et coordonnées des stations
+    print(f"🚲 Station de départ : {name_start} ({lat_start}, {lon_start})")
+    print(f"🏁 Station d'arrivée : {name_end} ({lat_end}, {lon_end})")
 
-print("✅ Coordonnées ajoutées à coordonnees.csv")
+if __name__ == "__main__":
+    main()
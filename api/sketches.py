@@ -0,0 +1,137 @@
+import heapq
+import numpy as np
+
+class TopK:
+    """
+    Les k plus grands éléments (valeur, *charge utile) dans un tas borné.
+    L'ordre est celui du tri de tuples : sorted(..., reverse=True)[:k].
+    """
+
+    def __init__(self, k=10):
+        self.k = k
+        self.heap = []
+
+    def push(self, item):
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, item)
+        elif item > self.heap[0]:
+            heapq.heappushpop(self.heap, item)
+
+    def update(self, values, *payloads):
+        """Ajoute un bloc de valeurs ; seuls les candidats au-dessus du seuil passent par le tas."""
+        values = np.asarray(values, dtype=np.float64)
+        candidates = np.flatnonzero(~np.isnan(values))
+        if len(candidates) > self.k:
+            threshold = np.partition(values[candidates], len(candidates) - self.k)[len(candidates) - self.k]
+            candidates = candidates[values[candidates] >= threshold]
+        columns = [values[candidates].tolist()] + [np.asarray(p)[candidates].tolist() for p in payloads]
+        for item in zip(*columns):
+            self.push(item)
+        return self
+
+    def merge(self, other):
+        for item in other.heap:
+            self.push(tuple(item))
+        return self
+
+    def items(self):
+        return sorted(self.heap, reverse=True)
+
+    def to_dict(self):
+        return {'k': self.k, 'items': self.items()}
+
+    @classmethod
+    def from_dict(cls, data):
+        top = cls(data['k'])
+        for item in data['items']:
+            top.push(tuple(item))
+        return top
+
+class KLLSketch:
+    """
+    Sketch de quantiles KLL : mémoire bornée (~k par niveau, niveaux
+    géométriquement décroissants) et fusionnable entre comptes ou exécutions.
+    Un élément du niveau h représente 2**h valeurs.
+    """
+
+    def __init__(self, k=400, seed=0):
+        self.k = k
+        self.count = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compact(self, level):
+        if level + 1 == len(self.levels):
+            self.levels.append(np.empty(0))
+        items = np.sort(self.levels[level])
+        # Un élément reste sur place si le nombre est impair
+        keep, items = items[:len(items) % 2], items[len(items) % 2:]
+        promoted = items[self._rng.integers(2)::2]
+        self.levels[level] = keep
+        self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+
+    def _compress(self):
+        while True:
+            for level, items in enumerate(self.levels):
+                if len(items) > self._capacity(level):
+                    self._compact(level)
+                    break
+            else:
+                return
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        self.count += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self._compress()
+        return self
+
+    def _weighted(self):
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level_items), 2 ** level) for level, level_items in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        return items[order], np.cumsum(weights[order])
+
+    def quantile(self, q):
+        if self.count == 0:
+            return None
+        items, cumulative = self._weighted()
+        index = np.searchsorted(cumulative, q * cumulative[-1], side="left")
+        return float(items[min(index, len(items) - 1)])
+
+    def quantiles(self, qs=(0.5, 0.9, 0.99)):
+        return {f"p{round(q * 100):g}": self.quantile(q) for q in qs}
+
+    def histogram(self, edges):
+        """Effectifs estimés par classe [edges[i], edges[i+1]), avec les classes ouvertes aux extrémités."""
+        if self.count == 0:
+            return [0] * (len(edges) + 1)
+        items, cumulative = self._weighted()
+        below = np.concatenate([[0], cumulative])[np.searchsorted(items, edges, side="left")]
+        bounds = np.concatenate([[0], below, [cumulative[-1]]])
+        counts = np.diff(bounds) * self.count / cumulative[-1]
+        return np.round(counts).astype(int).tolist()
+
+    def to_dict(self):
+        return {'k': self.k, 'count': self.count, 'levels': [items.tolist() for items in self.levels]}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data['k'])
+        sketch.count = data['count']
+        sketch.levels = [np.asarray(items, dtype=np.float64) for items in data['levels']]
+        return sketch
@@ -0,0 +1,87 @@
+import numpy as np
+
+from store import MISSING_ID
+from sketches import TopK, KLLSketch
+
+# Bornes des classes de durée (en minutes) et libellés correspondants
+DURATION_EDGES_MIN = [5, 10, 20, 30]
+DURATION_LABELS = ["<5 min", "5-10 min", "10-20 min", "20-30 min", ">30 min"]
+ELECTRIC_MAX_ID = 50000
+TOP_N = 10
+
+def count_values(values):
+    """
+    Comptage groupé : renvoie (valeurs, effectifs) triés par effectif décroissant,
+    les ex aequo gardant l'ordre de première apparition (comme Counter.most_common).
+    """
+    keys, first, counts = np.unique(values, return_index=True, return_counts=True)
+    order = np.lexsort((first, -counts))
+    return keys[order], counts[order]
+
+def compute_stats(trips):
+    """
+    Calcule toutes les statistiques d'analyze.py en quelques opérations
+    vectorisées sur la table des trajets (voir store.TRIP_DTYPE).
+    """
+    start = trips['start']
+    durations = (trips['end'] - start).astype("timedelta64[s]").astype(np.float64)
+    speeds = trips['speed'].astype(np.float64)
+    distance = trips['distance'].astype(np.float64)
+    bonus = trips['bonus'].astype(np.float64)
+    departure = trips['departure']
+    arrival = trips['arrival']
+    bikes = trips['bike']
+    count = len(trips)
+
+    # Départ puis arrivée de chaque trajet, dans l'ordre de la table
+    stations = np.column_stack([departure, arrival]).ravel()
+    stations = stations[stations != MISSING_ID]
+    station_ids, station_counts = count_values(stations)
+
+    known_bikes = bikes[bikes != MISSING_ID]
+    bike_ids, bike_counts = count_values(known_bikes)
+
+    duration_bins = np.bincount(
+        np.searchsorted(np.array(DURATION_EDGES_MIN) * 60, durations, side="right"),
+        minlength=len(DURATION_LABELS),
+    )
+
+    day = start.astype("datetime64[D]")
+    hours = np.bincount((start - day).astype("timedelta64[h]").astype(np.int64), minlength=24)
+    first_day = day.min() if count else np.datetime64("1970-01-01", "D")
+    day_counts = np.bincount((day - first_day).astype(np.int64))
+    days = first_day + np.flatnonzero(day_counts)
+    day_counts = day_counts[day_counts > 0]
+
+    # Classements et quantiles en mémoire bornée, fusionnables entre comptes
+    longest = TopK(TOP_N).update(durations, departure, arrival)
+    fastest = TopK(TOP_N).update(speeds, departure, arrival)
+    sketches = {
+        'duration_min': KLLSketch().update(durations / 60),
+        'speed_kmh': KLLSketch().update(speeds),
+        'distance_km': KLLSketch().update(distance / 1000),
+    }
+    valid_speeds = speeds[~np.isnan(speeds)]
+
+    return {
+        'trips': count,
+        'stations': list(zip(station_ids.tolist(), station_counts.tolist())),
+        'bikes': list(zip(bike_ids.tolist(), bike_counts.tolist())),
+        'longest': longest,
+        'fastest': fastest,
+        'sketches': sketches,
+        'electric_bikes': int(np.count_nonzero(bike_ids < ELECTRIC_MAX_ID)),
+        'mechanical_bikes': int(np.count_nonzero(bike_ids >= ELECTRIC_MAX_ID)),
+        'electric_trips': int(np.count_nonzero(known_bikes < ELECTRIC_MAX_ID)),
+        'mechanical_trips': int(np.count_nonzero(known_bikes >= ELECTRIC_MAX_ID)),
+        'boomerang_trips': int(np.count_nonzero(durations < 60)),
+        'bonus_trips': int(np.count_nonzero(bonus > 0)),
+        'total_bonus': float(bonus.sum()),
+        'total_distance': float(distance.sum()),
+        'avg_duration_min': float(durations.mean() / 60) if count else 0,
+        'avg_speed': float(valid_speeds.mean()) if len(valid_speeds) else 0,
+        'avg_distance_km': float(distance.sum() / count / 1000) if count else 0,
+        'duration_bins': dict(zip(DURATION_LABELS, duration_bins.tolist())),
+        'hours': {hour: int(n) for hour, n in enumerate(hours) if n},
+        'days': dict(zip(days.tolist(), day_counts.tolist())),
+    }
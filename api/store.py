@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import numpy as np
+
+STORE_FILE = "../data/trajets.npy"
+STATE_FILE = "../data/trajets.state.json"
+
+# Table des trajets en colonnes typées (un enregistrement par trajet)
+TRIP_DTYPE = np.dtype([
+    ('key', 'S40'),
+    ('start', 'datetime64[s]'),
+    ('end', 'datetime64[s]'),
+    ('departure', np.int32),
+    ('arrival', np.int32),
+    ('bike', np.int32),
+    ('lat_start', np.float32),
+    ('lon_start', np.float32),
+    ('lat_end', np.float32),
+    ('lon_end', np.float32),
+    ('distance', np.float32),
+    ('speed', np.float32),
+    ('bonus', np.float32),
+])
+MISSING_ID = -1
+
+def operation_key(obj):
+    """
+    Identifiant stable d'une opération : son id s'il existe,
+    sinon une empreinte de startDate / stations / vélo.
+    """
+    for field in ("operationId", "id"):
+        if obj.get(field) is not None:
+            return str(obj[field])
+    p3 = obj.get('parameter3', {})
+    raw = "|".join(str(v) for v in (
+        obj.get('startDate'), p3.get('departureStationId'), p3.get('arrivalStationId'), p3.get('BIKEID')
+    ))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+def load_state(state_path=STATE_FILE):
+    """Renvoie l'état du magasin : filigrane (startDate max) et nombre de trajets."""
+    try:
+        with open(state_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"watermark": None, "count": 0}
+
+def open_trips(store_path=STORE_FILE):
+    """Table des trajets en lecture seule, projetée en mémoire (memory-map)."""
+    if not os.path.exists(store_path):
+        return np.empty(0, dtype=TRIP_DTYPE)
+    return np.load(store_path, mmap_mode="r")
+
+def stored_keys(store_path=STORE_FILE):
+    return {key.decode("utf-8") for key in open_trips(store_path)['key']}
+
+def is_new(obj, key, seen_keys, watermark):
+    """Une opération est à traiter si elle n'est pas antérieure au filigrane et pas encore vue."""
+    start = obj.get('startDate')
+    if watermark and start and start < watermark:
+        return False
+    return key not in seen_keys
+
+def _as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return MISSING_ID
+
+def _as_float(value):
+    return np.nan if value is None else float(value)
+
+def parse_iso8601_array(values):
+    """Conversion groupée de dates ISO 8601 ('...Z') en datetime64[s]."""
+    return np.array([v.rstrip("Z") for v in values], dtype="datetime64[s]")
+
+def to_row(record):
+    """
+    Convertit un trajet (dict issu d'analyze.parse_operation) en ligne de la table.
+    Les dates sont converties d'un bloc dans append_trips.
+    """
+    coords = record['coords'] or (None, None, None, None)
+    return (
+        record['key'].encode("utf-8"),
+        np.datetime64("NaT"),
+        np.datetime64("NaT"),
+        _as_int(record['departure']),
+        _as_int(record['arrival']),
+        _as_int(record['bike']),
+        *(_as_float(c) for c in coords),
+        record['distance'],
+        _as_float(record['speed']),
+        record['bonus'],
+    )
+
+def append_trips(records, state, store_path=STORE_FILE, state_path=STATE_FILE):
+    """Ajoute les nouveaux trajets en fin de table puis met à jour le filigrane."""
+    if not records:
+        return state
+    new_rows = np.array([to_row(r) for r in records], dtype=TRIP_DTYPE)
+    new_rows['start'] = parse_iso8601_array([r['start'] for r in records])
+    new_rows['end'] = parse_iso8601_array([r['end'] for r in records])
+    trips = np.concatenate([open_trips(store_path), new_rows])
+    tmp = store_path + ".tmp.npy"
+    np.save(tmp, trips)
+    os.replace(tmp, store_path)
+
+    starts = [r['start'] for r in records]
+    if state.get("watermark"):
+        starts.append(state["watermark"])
+    state = {"watermark": max(starts), "count": len(trips)}
+    with open(state_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    return state
+
+def reset_store(store_path=STORE_FILE, state_path=STATE_FILE):
+    for path in (store_path, state_path):
+        if os.path.exists(path):
+            os.remove(path)
@@ -0,0 +1,98 @@
+import json
+import re
+
+CHUNK_SIZE = 1 << 16
+
+# Caractères structurants hors chaîne, puis caractères significatifs dans une chaîne
+_STRUCT = re.compile(rb'[{}\[\]"]')
+_IN_STRING = re.compile(rb'["\\]')
+
+def report_malformed(offset, error):
+    print(f"⚠️ Enregistrement illisible à l'octet {offset} : {error}")
+
+def iter_wallet_operations(path, chunk_size=CHUNK_SIZE, on_error=report_malformed):
+    """
+    Lit data.txt par blocs et renvoie les walletOperations une par une.
+    Un petit tokenizer suit la profondeur d'imbrication et les chaînes pour
+    découper chaque élément du tableau sans charger tout le document.
+    Un enregistrement invalide est signalé avec son offset en octets puis ignoré.
+    """
+    depth = 0
+    in_string = False
+    in_array = False
+    key_start = None   # début de la chaîne courante au premier niveau
+    last_key = None
+    elem_start = None  # début de l'élément courant du tableau
+    buf = b""
+    base = 0           # offset dans le fichier de buf[0]
+    pos = 0
+
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            buf += chunk
+
+            while True:
+                m = (_IN_STRING if in_string else _STRUCT).search(buf, pos)
+                if m is None:
+                    pos = len(buf)
+                    break
+                i = m.start()
+                c = buf[i]
+
+                if in_string:
+                    if c == 0x5C:  # antislash : on saute le caractère échappé
+                        if i + 1 >= len(buf):
+                            pos = i
+                            break
+                        pos = i + 2
+                        continue
+                    in_string = False
+                    pos = i + 1
+                    if key_start is not None:
+                        last_key = buf[key_start:i]
+                        key_start = None
+                    continue
+
+                pos = i + 1
+                if c == 0x22:  # "
+                    in_string = True
+                    if depth == 1:
+                        key_start = i + 1
+                elif c in b"{[":
+                    if in_array and depth == 2 and c == 0x7B:
+                        elem_start = i
+                    elif depth == 1 and c == 0x5B and last_key == b"walletOperations":
+                        in_array = True
+                    depth += 1
+                else:
+                    depth -= 1
+                    if in_array and depth == 2 and c == 0x7D and elem_start is not None:
+                        raw = buf[elem_start:i + 1]
+                        offset = base + elem_start
+                        elem_start = None
+                        try:
+                            yield json.loads(raw)
+                        except ValueError as e:
+                            on_error(offset, e)
+                    elif in_array and depth == 1:
+                        in_array = False
+
+            # On ne garde en mémoire que l'élément en cours de lecture
+            cut = pos
+            if elem_start is not None:
+                cut = min(cut, elem_start)
+            if key_start is not None:
+                cut = min(cut, key_start)
+            buf = buf[cut:]
+            base += cut
+            pos -= cut
+            if elem_start is not None:
+                elem_start -= cut
+            if key_start is not None:
+                key_start -= cut
+
+    if elem_start is not None:
+        on_error(base + elem_start, "enregistrement tronqué en fin de fichier")
@@ -0,0 +1,132 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "api"))
+import analyze
+from catalog import load_catalog
+from sketches import TopK, KLLSketch
+
+AGGREGATES_FILE = "aggregats.json"
+FLEET_FILE = "flotte.json"
+COUNTERS = ('stations', 'bikes', 'hours', 'days', 'durations', 'edges')
+TOTALS = ('trips', 'distance', 'bonus')
+RANKINGS = ('longest', 'fastest')
+
+# Graphe compilé chargé une seule fois par processus de travail
+_snapshot = None
+
+def _init_worker(route):
+    global _snapshot
+    if route:
+        import road
+        _snapshot = road.load_snapshot()
+
+def find_exports(directory):
+    """Un fichier d'export par compte (data.txt renommé, ex. : alice.txt)."""
+    return sorted(glob.glob(os.path.join(directory, "*.txt")) + glob.glob(os.path.join(directory, "*.json")))
+
+def process_account(export_path, out_root, route=False, rebuild=False):
+    """
+    Traite un compte : sorties sous out_root/<compte>/ et agrégats partiels
+    dans out_root/<compte>/aggregats.json.
+    """
+    account = os.path.splitext(os.path.basename(export_path))[0]
+    prefix = os.path.join(out_root, account)
+    data_dir = os.path.join(prefix, "data")
+    output_dir = os.path.join(prefix, "output")
+    os.makedirs(data_dir, exist_ok=True)
+    os.makedirs(output_dir, exist_ok=True)
+
+    partial = analyze.analyze(export_path, data_dir, output_dir, rebuild=rebuild, verbose=False)
+    if partial is None:
+        return account, None
+
+    if route:
+        import road
+        edge_usage = road.run(
+            os.path.join(data_dir, "trajets.npy"),
+            os.path.join(data_dir, "trajects.geojson"),
+            snapshot=_snapshot,
+        )
+        partial['edges'] = {",".join(map(str, edge)): count for edge, count in edge_usage.items()}
+
+    partial_path = os.path.join(prefix, AGGREGATES_FILE)
+    with open(partial_path, "w", encoding="utf-8") as f:
+        json.dump(partial, f)
+    return account, partial_path
+
+def merge_aggregates(paths):
+    """Fusionne les agrégats partiels des comptes, sans retraiter aucun trajet."""
+    fleet = {key: 0 for key in TOTALS}
+    counters = {key: Counter() for key in COUNTERS}
+    rankings = {key: TopK() for key in RANKINGS}
+    sketches = {}
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            partial = json.load(f)
+        for key in TOTALS:
+            fleet[key] += partial.get(key, 0)
+        for key in COUNTERS:
+            counters[key].update(partial.get(key, {}))
+        for key in RANKINGS:
+            if key in partial:
+                rankings[key].merge(TopK.from_dict(partial[key]))
+        for name, data in partial.get('sketches', {}).items():
+            sketch = KLLSketch.from_dict(data)
+            sketches[name] = sketches[name].merge(sketch) if name in sketches else sketch
+    fleet['accounts'] = len(paths)
+    fleet.update({key: dict(counter) for key, counter in counters.items()})
+    fleet.update({key: ranking.to_dict() for key, ranking in rankings.items()})
+    fleet['quantiles'] = {name: sketch.quantiles() for name, sketch in sketches.items()}
+    fleet['sketches'] = {name: sketch.to_dict() for name, sketch in sketches.items()}
+    return fleet
+
+def main():
+    parser = argparse.ArgumentParser(description="Traitement par lot de plusieurs comptes Vélib'.")
+    parser.add_argument("exports", help="Dossier contenant un export data.txt par compte")
+    parser.add_argument("--out", default="output/comptes", help="Dossier des sorties par compte")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Nombre de processus")
+    parser.add_argument("--route", action="store_true", help="Calcule aussi les itinéraires (road.py)")
+    parser.add_argument("--rebuild", action="store_true", help="Repart de zéro pour chaque compte")
+    parser.add_argument("--merge-only", action="store_true", help="Refait uniquement la fusion des agrégats")
+    args = parser.parse_args()
+
+    start = time.time()
+    if args.merge_only:
+        partial_paths = sorted(glob.glob(os.path.join(args.out, "*", AGGREGATES_FILE)))
+    else:
+        exports = find_exports(args.exports)
+        print(f"📂 {len(exports)} comptes à traiter avec {args.workers} processus...")
+        # Le catalogue est rafraîchi une fois ici ; les processus lisent l'instantané
+        load_catalog()
+
+        partial_paths = []
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=(args.route,)) as pool:
+            futures = [pool.submit(process_account, path, args.out, args.route, args.rebuild) for path in exports]
+            for future in as_completed(futures):
+                try:
+                    account, partial_path = future.result()
+                except Exception as e:
+                    print(f"❌ Compte ignoré (erreur : {e})")
+                    continue
+                if partial_path is None:
+                    print(f"⚠️ Compte {account} : aucun trajet.")
+                    continue
+                print(f"✅ Compte {account} traité.")
+                partial_paths.append(partial_path)
+
+    fleet = merge_aggregates(partial_paths)
+    fleet_path = os.path.join(args.out, FLEET_FILE)
+    os.makedirs(args.out, exist_ok=True)
+    with open(fleet_path, "w", encoding="utf-8") as f:
+        json.dump(fleet, f)
+    print(f"✅ {fleet['accounts']} comptes fusionnés ({fleet['trips']} trajets) dans '{fleet_path}' en {time.time() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Benchmark du mode canvas de web-maker.py (canvas_layer.py).
+Côté Python : préparation des tableaux typés et taille transmise, contre le GeoJSON actuel.
+Côté navigateur : écrit une page autonome qui génère des couches synthétiques de taille
+croissante et mesure le temps de dessin ; l'ouvrir dans un navigateur quelconque.
+Utilisation : python3 benchmarks/bench_canvas.py [--edges 10000 100000] [--page output/bench_canvas.html]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import folium
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from canvas_layer import CANVAS_LINES_JS, pack_lines
+from bench_lod import synthetic_edges
+
+PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Benchmark canvas - trajets</title>
+<link rel="stylesheet" href="%(leaflet_css)s">
+<script src="%(leaflet_js)s"></script>
+<style>
+    body { margin: 0; font-family: Arial; }
+    #map { height: 70vh; }
+    table { border-collapse: collapse; margin: 10px; }
+    td, th { padding: 4px 10px; border-bottom: 1px solid #ddd; text-align: right; }
+</style>
+</head>
+<body>
+<div id="map"></div>
+<table id="results">
+    <tr><th>Segments</th><th>Sommets</th><th>Génération (ms)</th><th>Dessin moyen (ms)</th><th>Dessin max (ms)</th><th>Images/s</th></tr>
+</table>
+<script>
+%(library)s
+
+var SIZES = %(sizes)s, REPEAT = 10, HALF = 20037508.342789244;
+var map = L.map('map', {preferCanvas: true}).setView([48.8566, 2.3522], 12);
+
+// Tronçons sinueux de 5 à 30 sommets (pas de 10 m) répartis sur Paris, styles en 32 x 13 paliers
+function synthetic(n) {
+    var sizes = new Uint32Array(n), total = 0;
+    for (var i = 0; i < n; i++) { sizes[i] = 5 + Math.floor(Math.random() * 25); total += sizes[i]; }
+    var a = {origin: [253000, 6240000], coords: new Float32Array(2 * total), offsets: new Uint32Array(n + 1),
+             boxes: new Float32Array(4 * n), colors: new Uint8Array(4 * n), widths: new Float32Array(n),
+             features: new Uint32Array(n), properties: {}};
+    var order = [];
+    for (i = 0; i < n; i++) { order.push([2 + Math.floor(Math.random() * 13) / 2, Math.floor(Math.random() * 32)]); }
+    order.sort(function (p, q) { return p[0] - q[0] || p[1] - q[1]; });
+    for (i = 0, j = 0; i < n; i++) {
+        a.offsets[i] = j;
+        var x = Math.random() * 23000, y = Math.random() * 20000, heading = Math.random() * 2 * Math.PI;
+        a.boxes[4 * i] = a.boxes[4 * i + 1] = Infinity;
+        a.boxes[4 * i + 2] = a.boxes[4 * i + 3] = -Infinity;
+        for (var k = 0; k < sizes[i]; k++, j++) {
+            if (k > 0) { heading += (Math.random() - 0.5) * 0.3; x += 10 * Math.cos(heading); y += 10 * Math.sin(heading); }
+            a.coords[2 * j] = x;
+            a.coords[2 * j + 1] = y;
+            a.boxes[4 * i] = Math.min(a.boxes[4 * i], x);
+            a.boxes[4 * i + 1] = Math.min(a.boxes[4 * i + 1], y);
+            a.boxes[4 * i + 2] = Math.max(a.boxes[4 * i + 2], x);
+            a.boxes[4 * i + 3] = Math.max(a.boxes[4 * i + 3], y);
+        }
+        a.widths[i] = order[i][0];
+        a.colors.set([120 + 4 * order[i][1], 100, 200 - 4 * order[i][1], 255], 4 * i);
+    }
+    a.offsets[n] = j;
+    return {arrays: a, vertices: total};
+}
+
+function run(index) {
+    if (index >= SIZES.length) { return; }
+    var start = performance.now(), data = synthetic(SIZES[index]), built = performance.now() - start;
+    var layer = new L.CanvasLines(data.arrays).addTo(map);
+    var times = [];
+    for (var r = 0; r < REPEAT; r++) { times.push(layer.draw()); }
+    var mean = times.reduce(function (s, t) { return s + t; }, 0) / REPEAT, max = Math.max.apply(null, times);
+    var row = document.getElementById('results').insertRow();
+    [SIZES[index], data.vertices, built.toFixed(0), mean.toFixed(1), max.toFixed(1), (1000 / mean).toFixed(0)]
+        .forEach(function (value) { row.insertCell().textContent = value; });
+    map.removeLayer(layer);
+    // Laisse le navigateur afficher la ligne avant la taille suivante
+    setTimeout(function () { run(index + 1); }, 50);
+}
+run(0);
+</script>
+</body>
+</html>
+"""
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--edges", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 300000],
+                        help="Tailles des couches de la page de benchmark")
+    parser.add_argument("--page", default="output/bench_canvas.html")
+    args = parser.parse_args()
+
+    for n in args.edges:
+        gdf = synthetic_edges(n)
+        start = time.perf_counter()
+        geojson = gdf.to_crs(epsg=4326).to_json()
+        geojson_time = time.perf_counter() - start
+        start = time.perf_counter()
+        packed = pack_lines(gdf, ["#e06666"] * len(gdf), (2 + gdf['count'] / gdf['count'].max() * 6).round(1),
+                            ('count', 'km'))
+        pack_time = time.perf_counter() - start
+        print(f"{n:>7} segments : GeoJSON {len(geojson) / 1e6:6.2f} Mo en {geojson_time:5.2f} s | "
+              f"tableaux typés {len(json.dumps(packed)) / 1e6:6.2f} Mo en {pack_time:5.2f} s")
+
+    js, css = dict(folium.Map.default_js), dict(folium.Map.default_css)
+    with open(args.page, "w", encoding="utf-8") as f:
+        f.write(PAGE % {'leaflet_js': js['leaflet'], 'leaflet_css': css['leaflet_css'],
+                        'library': CANVAS_LINES_JS, 'sizes': json.dumps(args.sizes)})
+    print(f"🧪 Page de mesure du dessin écrite dans '{args.page}' : l'ouvrir dans un navigateur")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark : couches de la carte en GeoJSON pleine précision contre l'étape de niveaux
+de détail (TopoJSON simplifié et quantifié par bande de zoom, voir map_lod.py).
+Utilisation : python3 benchmarks/bench_lod.py [--quartiers 80] [--edges 2000 20000]
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import folium
+import geopandas as gpd
+import numpy as np
+import shapely
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import cache_utils
+import map_lod
+
+# Paris intra-muros, en mètres Web Mercator
+BOUNDS = (253000, 6240000, 276000, 6260000)
+
+def synthetic_quartiers(n, seed=0):
+    """Cellules de Voronoï aux frontières densifiées (un sommet tous les 5 m, comme un tracé cadastral)."""
+    rng = np.random.default_rng(seed)
+    minx, miny, maxx, maxy = BOUNDS
+    points = shapely.multipoints(np.column_stack([rng.uniform(minx, maxx, n), rng.uniform(miny, maxy, n)]))
+    cells = shapely.intersection(shapely.get_parts(shapely.voronoi_polygons(points)), shapely.box(*BOUNDS))
+    cells = shapely.segmentize(cells, 5)
+    return gpd.GeoDataFrame({'l_qu': [f"Quartier {i}" for i in range(len(cells))],
+                             'total_trajets': rng.integers(0, 5000, len(cells))}, geometry=cells, crs=3857)
+
+def synthetic_edges(n, seed=0):
+    """Tronçons de rue sinueux de 50 à 300 m (un sommet tous les 10 m environ)."""
+    rng = np.random.default_rng(seed)
+    minx, miny, maxx, maxy = BOUNDS
+    sizes = rng.integers(5, 30, n)
+    starts = np.column_stack([rng.uniform(minx, maxx, n), rng.uniform(miny, maxy, n)])
+    headings = np.repeat(rng.uniform(0, 2 * np.pi, n), sizes) + rng.normal(0, 0.15, sizes.sum())
+    steps = np.column_stack([np.cos(headings), np.sin(headings)]) * 10
+    parts = np.repeat(np.arange(n), sizes)
+    first = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    steps[first] = 0
+    coords = np.repeat(starts, sizes, axis=0) + np.cumsum(steps, axis=0) - np.repeat(np.cumsum(steps, axis=0)[first], sizes, axis=0)
+    counts = rng.integers(1, 200, n)
+    gdf = gpd.GeoDataFrame({'count': counts}, geometry=shapely.linestrings(coords, indices=parts), crs=3857)
+    gdf['km'] = gdf.length / 1000
+    return gdf
+
+def html_size(layer_factory):
+    """Taille du HTML folium d'une carte ne contenant que la couche testée."""
+    m = folium.Map(location=[48.8566, 2.3522], zoom_start=13, tiles=None)
+    layer_factory(m)
+    return len(m.get_root().render().encode())
+
+def style(feature):
+    return {'color': "#e06666", 'weight': 2}
+
+def bench(name, gdf, columns):
+    # Sortie actuelle : GeoJSON en WGS84 pleine précision
+    start = time.perf_counter()
+    geojson_size = html_size(lambda m: folium.GeoJson(gdf.to_crs(epsg=4326)[columns + ['geometry']],
+                                                       style_function=style).add_to(m))
+    geojson_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    topos = map_lod.topologies({name: gdf}, {name: columns})
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    map_lod.topologies({name: gdf}, {name: columns})
+    cached = time.perf_counter() - start
+
+    sizes = {band: len(json.dumps(topo, separators=(",", ":"))) for band, topo in topos.items()}
+    lod_size = html_size(lambda m: map_lod.add_banded_layers(folium.FeatureGroup(name).add_to(m), m,
+                                                             map_lod.topologies({name: gdf}, {name: columns}), name, style))
+    raw = len(gdf.to_crs(epsg=4326)[columns + ['geometry']].to_json())
+    print(f"{name:>10} ({len(gdf)} géométries, {int(shapely.get_num_coordinates(gdf.geometry.values).sum())} sommets)")
+    print(f"           GeoJSON brut {raw / 1e6:7.2f} Mo | HTML folium {geojson_size / 1e6:7.2f} Mo en {geojson_time:5.2f} s")
+    print("           TopoJSON   " + " | ".join(f"{band} {size / 1e6:.2f} Mo" for band, size in sizes.items()))
+    print(f"           HTML LOD (3 bandes) {lod_size / 1e6:7.2f} Mo | calcul {cold:5.2f} s, depuis le cache {cached:5.3f} s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--quartiers", type=int, default=80)
+    parser.add_argument("--edges", type=int, nargs="+", default=[2000, 20000])
+    args = parser.parse_args()
+
+    # Cache temporaire : le benchmark ne touche pas cache/ du dépôt
+    cache_utils.CACHE_DIR = tempfile.mkdtemp(prefix="bench-lod-")
+    try:
+        bench("quartiers", synthetic_quartiers(args.quartiers), ['l_qu', 'total_trajets'])
+        for n in args.edges:
+            bench("trajets", synthetic_edges(n), ['count', 'km'])
+    finally:
+        shutil.rmtree(cache_utils.CACHE_DIR, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Benchmark : nx.shortest_path par trajet contre le moteur CSR (un arbre par origine).
+Vérifie aussi que les deux moteurs renvoient exactement les mêmes chemins.
+Compare ensuite, requête par requête, Dijkstra, A* et ALT (nœuds fixés par requête,
+temps de bout en bout). Avec --workers N, mesure aussi le calcul réparti sur N processus (graphe partagé en memory-map).
+Utilisation : python3 benchmarks/bench_routing.py [--size 100] [--trips 500] [--origins 50] [--workers 4]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import networkx as nx
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from goal_routing import AStarRouter, ALTRouter, GoalRouter, haversine, load_landmarks
+from routing import CSRGraph, route_pairs, route_usage
+
+def grid_graph(size, seed=0):
+    """
+    Grille size x size à double sens et quelques arêtes parallèles ; longueurs aléatoires,
+    au moins égales à la distance à vol d'oiseau (comme celles d'OSM).
+    """
+    rng = np.random.default_rng(seed)
+    G = nx.MultiDiGraph()
+    for i in range(size):
+        for j in range(size):
+            G.add_node(i * size + j, x=2.30 + j * 0.0008, y=48.80 + i * 0.0008)
+    for i in range(size):
+        for j in range(size):
+            for di, dj in ((0, 1), (1, 0)):
+                if i + di < size and j + dj < size:
+                    a, b = i * size + j, (i + di) * size + j + dj
+                    straight = float(haversine(G.nodes[a]['y'], G.nodes[a]['x'], G.nodes[b]['y'], G.nodes[b]['x']))
+                    length = straight * float(rng.uniform(1.0, 1.6))
+                    G.add_edge(a, b, length=length)
+                    G.add_edge(b, a, length=length)
+                    if rng.random() < 0.02:
+                        G.add_edge(a, b, length=max(straight, length * rng.uniform(0.5, 1.5)))
+    return G
+
+def random_pairs(G, trips, origins, seed=0):
+    rng = np.random.default_rng(seed)
+    nodes = np.array(G.nodes)
+    starts = rng.choice(nodes, origins, replace=False)
+    return [(int(rng.choice(starts)), int(rng.choice(nodes))) for _ in range(trips)]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=100)
+    parser.add_argument("--trips", type=int, default=500)
+    parser.add_argument("--origins", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    G = grid_graph(args.size)
+    pairs = random_pairs(G, args.trips, args.origins)
+    print(f"Graphe : {G.number_of_nodes()} nœuds, {G.number_of_edges()} arêtes ; {len(pairs)} trajets, {args.origins} origines")
+
+    t0 = time.perf_counter()
+    baseline = {pair: nx.shortest_path(G, *pair, weight='length') for pair in pairs}
+    networkx_time = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    graph = CSRGraph.from_networkx(G)
+    compile_time = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    routes = route_pairs(graph, set(pairs))
+    csr_time = time.perf_counter() - t0
+
+    # Chemins networkx traduits en identifiants d'arêtes (la plus courte des parallèles)
+    baseline_edges = {
+        pair: graph.path_edges(np.array([graph.index[node] for node in path], dtype=np.int32)).tolist()
+        for pair, path in baseline.items()
+    }
+    assert all(routes[pair].tolist() == edges for pair, edges in baseline_edges.items()), "chemins différents"
+    print(f"networkx (Dijkstra par trajet) : {networkx_time:.2f}s")
+    print(f"CSR (compilation)              : {compile_time:.2f}s")
+    print(f"CSR (un arbre par origine)     : {csr_time:.2f}s  ({networkx_time / csr_time:.0f}x)")
+    print("✅ Chemins identiques")
+
+    directory = tempfile.mkdtemp()
+    graph.save(directory)
+    node_ids = graph.node_ids.tolist()
+    np.save(os.path.join(directory, "lat.npy"), np.array([G.nodes[n]['y'] for n in node_ids]))
+    np.save(os.path.join(directory, "lon.npy"), np.array([G.nodes[n]['x'] for n in node_ids]))
+    counts = {pair: 1 for pair in set(pairs)}
+
+    t0 = time.perf_counter()
+    table = load_landmarks(graph, directory)
+    print(f"ALT (table des repères)        : {time.perf_counter() - t0:.2f}s")
+    routers = {
+        'Dijkstra': GoalRouter(graph),
+        'A*': AStarRouter(graph, np.load(os.path.join(directory, "lat.npy")), np.load(os.path.join(directory, "lon.npy"))),
+        'ALT': ALTRouter(graph, table),
+    }
+    for name, router in routers.items():
+        t0 = time.perf_counter()
+        for orig, dest in counts:
+            path = router.path(graph.index[orig], graph.index[dest])
+            assert graph.node_ids[path].tolist() == baseline[(orig, dest)], f"{name} : chemins différents"
+        elapsed = time.perf_counter() - t0
+        label = f"{name} (par requête)"
+        print(f"{label:<31}: {elapsed:.2f}s, {router.settled / router.queries:.0f} nœuds fixés par requête")
+
+    for engine in ('dijkstra', 'astar', 'alt'):
+        t0 = time.perf_counter()
+        engine_routes, _ = route_usage(graph, counts, directory=directory, engine=engine)
+        elapsed = time.perf_counter() - t0
+        assert all(engine_routes[pair].tolist() == edges for pair, edges in baseline_edges.items()), f"{engine} : chemins différents"
+        label = f"route_usage(engine='{engine}')"
+        print(f"{label:<31}: {elapsed:.2f}s")
+    print("✅ Chemins identiques pour les trois moteurs")
+
+    if args.workers > 1:
+        _, serial_usage = route_usage(graph, counts)
+        t0 = time.perf_counter()
+        parallel, usage = route_usage(graph, counts, workers=args.workers, directory=directory)
+        parallel_time = time.perf_counter() - t0
+        assert all(parallel[pair].tolist() == edges for pair, edges in baseline_edges.items()), "chemins différents"
+        assert (usage == serial_usage).all(), "usage différent"
+        label = f"CSR ({args.workers} processus)"
+        print(f"{label:<31}: {parallel_time:.2f}s  ({csr_time / parallel_time:.1f}x)")
+    shutil.rmtree(directory)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark : boucle Python historique d'analyze.py contre le moteur vectorisé.
+Utilisation : python3 benchmarks/bench_stats.py [--sizes 10000 100000 1000000]
+"""
+import argparse
+import os
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api"))
+from store import TRIP_DTYPE
+from stats_engine import compute_stats
+
+def synthetic_trips(n, seed=0):
+    """Table de trajets aléatoires (1 400 stations, 20 000 vélos, 2 ans d'historique)."""
+    rng = np.random.default_rng(seed)
+    trips = np.zeros(n, dtype=TRIP_DTYPE)
+    trips['start'] = np.datetime64("2023-01-01T00:00:00") + rng.integers(0, 2 * 365 * 86400, n).astype("timedelta64[s]")
+    trips['end'] = trips['start'] + rng.integers(10, 3600, n).astype("timedelta64[s]")
+    trips['departure'] = rng.integers(1, 1400, n)
+    trips['arrival'] = rng.integers(1, 1400, n)
+    trips['bike'] = rng.integers(1, 100000, n)
+    trips['distance'] = rng.uniform(100, 9000, n)
+    trips['speed'] = rng.uniform(5, 25, n)
+    trips['bonus'] = rng.choice([0, 0, 1, 2], n)
+    return trips
+
+def as_operations(trips):
+    """Mêmes trajets au format walletOperations, pour la boucle historique."""
+    return [{
+        'startDate': f"{start}Z", 'endDate': f"{end}Z",
+        'parameter3': {
+            'departureStationId': str(dep), 'arrivalStationId': str(arr), 'BIKEID': str(bike),
+            'DISTANCE': str(distance), 'AVERAGE_SPEED': str(speed), 'BONUS_EARNED': str(bonus),
+        },
+    } for start, end, dep, arr, bike, distance, speed, bonus in zip(
+        trips['start'].astype(str), trips['end'].astype(str), trips['departure'].tolist(), trips['arrival'].tolist(),
+        trips['bike'].tolist(), trips['distance'].tolist(), trips['speed'].tolist(), trips['bonus'].tolist(),
+    )]
+
+def legacy_stats(raw_objects):
+    """Boucle par objet telle qu'elle existait dans analyze.main."""
+    station_counter = Counter()
+    bike_counter = Counter()
+    trajet_durations = []
+    trajet_speeds = []
+    trajets_per_hour = defaultdict(int)
+    trajets_per_day = defaultdict(int)
+    total_distance = 0.0
+    for obj in raw_objects:
+        p3 = obj.get('parameter3', {})
+        departure = p3.get('departureStationId')
+        arrival = p3.get('arrivalStationId')
+        start_dt = datetime.strptime(obj['startDate'], "%Y-%m-%dT%H:%M:%SZ")
+        end_dt = datetime.strptime(obj['endDate'], "%Y-%m-%dT%H:%M:%SZ")
+        duration_sec = (end_dt - start_dt).total_seconds()
+        station_counter[departure] += 1
+        station_counter[arrival] += 1
+        trajet_durations.append((duration_sec, departure, arrival))
+        trajet_speeds.append((float(p3.get('AVERAGE_SPEED')), departure, arrival))
+        bike_counter[p3.get('BIKEID')] += 1
+        total_distance += float(p3.get('DISTANCE', 0))
+        trajets_per_hour[start_dt.hour] += 1
+        trajets_per_day[start_dt.date()] += 1
+    duration_bins = [0] * 5
+    for duration_sec, _, _ in trajet_durations:
+        minutes = duration_sec / 60
+        if minutes < 5:
+            duration_bins[0] += 1
+        elif minutes < 10:
+            duration_bins[1] += 1
+        elif minutes < 20:
+            duration_bins[2] += 1
+        elif minutes < 30:
+            duration_bins[3] += 1
+        else:
+            duration_bins[4] += 1
+    sorted(trajet_durations, reverse=True)[:10]
+    sorted(trajet_speeds, reverse=True)[:10]
+    return station_counter.most_common(10), duration_bins, dict(trajets_per_hour)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'trajets':>10} | {'boucle (s)':>10} | {'vectorisé (s)':>13} | {'gain':>6}")
+    for n in args.sizes:
+        trips = synthetic_trips(n)
+        raw_objects = as_operations(trips)
+
+        t0 = time.perf_counter()
+        top_stations, bins, hours = legacy_stats(raw_objects)
+        legacy = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        stats = compute_stats(trips)
+        vectorized = time.perf_counter() - t0
+
+        # Contrôle de cohérence entre les deux implémentations
+        assert list(stats['duration_bins'].values()) == bins
+        assert stats['hours'] == hours
+        assert [count for _, count in stats['stations'][:10]] == [count for _, count in top_stations]
+        print(f"{n:>10} | {legacy:>10.3f} | {vectorized:>13.3f} | {legacy / vectorized:>5.0f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+import hashlib
+import json
+import os
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+
+def file_digest(path, chunk_size=1 << 20):
+    """Empreinte SHA-256 d'un fichier, lue par blocs."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def cache_path(*parts):
+    """Chemin dans cache/ (les dossiers intermédiaires sont créés)."""
+    path = os.path.join(CACHE_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+def cached_digest(path):
+    """Empreinte d'un fichier, recalculée seulement si sa taille ou sa date ont changé (index dans cache/)."""
+    index_file = cache_path("digests.json")
+    try:
+        with open(index_file, "r", encoding="utf-8") as f:
+            known = json.load(f)
+    except (OSError, ValueError):
+        known = {}
+    key = os.path.abspath(path)
+    stat = os.stat(path)
+    entry = known.get(key)
+    if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+        return entry[2]
+    digest = file_digest(path)
+    known[key] = [stat.st_size, stat.st_mtime_ns, digest]
+    tmp = f"{index_file}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(known, f)
+    os.replace(tmp, index_file)
+    return digest
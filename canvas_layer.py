@@ -0,0 +1,232 @@
+import base64
+
+import numpy as np
+import shapely
+from folium.map import Layer
+from jinja2 import Template
+
+HALF_WORLD = 20037508.342789244  # demi-circonférence en Web Mercator (EPSG:3857)
+
+# Couche Leaflet qui dessine toutes les lignes sur un seul canvas, à partir de tableaux typés :
+# coordonnées Web Mercator relatives (Float32), bornes de chaque ligne, couleur RGBA (Uint8) et
+# épaisseur (Float32) par ligne. Les lignes consécutives de même style forment un seul tracé.
+CANVAS_LINES_JS = """
+if (!L.CanvasLines) {
+    L.CanvasLines = L.Layer.extend({
+        options: {pane: 'overlayPane', opacity: 0.85, tolerance: 6, fields: [], aliases: []},
+
+        initialize: function (arrays, options) {
+            L.setOptions(this, options);
+            this._arrays = arrays;
+            var colors = arrays.colors, widths = arrays.widths;
+            this._batches = [];
+            this._styles = [];
+            for (var i = 0, n = widths.length; i <= n; i++) {
+                if (i === 0 || i === n || widths[i] !== widths[i - 1] ||
+                        colors[4 * i] !== colors[4 * i - 4] || colors[4 * i + 1] !== colors[4 * i - 3] ||
+                        colors[4 * i + 2] !== colors[4 * i - 2] || colors[4 * i + 3] !== colors[4 * i - 1]) {
+                    this._batches.push(i);
+                    if (i < n) {
+                        this._styles.push('rgba(' + colors[4 * i] + ',' + colors[4 * i + 1] + ',' +
+                                          colors[4 * i + 2] + ',' + colors[4 * i + 3] / 255 + ')');
+                    }
+                }
+            }
+        },
+
+        getEvents: function () {
+            return {moveend: this._reset, resize: this._reset, zoomanim: this._animateZoom, click: this._click};
+        },
+
+        onAdd: function () {
+            this._canvas = L.DomUtil.create('canvas', 'leaflet-zoom-animated');
+            this.getPane().appendChild(this._canvas);
+            this._reset();
+        },
+
+        onRemove: function () {
+            L.DomUtil.remove(this._canvas);
+        },
+
+        _reset: function () {
+            var map = this._map, size = map.getSize(), ratio = window.devicePixelRatio || 1;
+            this._topLeft = map.containerPointToLayerPoint([0, 0]);
+            L.DomUtil.setPosition(this._canvas, this._topLeft);
+            this._canvas.width = size.x * ratio;
+            this._canvas.height = size.y * ratio;
+            this._canvas.style.width = size.x + 'px';
+            this._canvas.style.height = size.y + 'px';
+            this._bounds = map.getBounds();
+            // Mètres Web Mercator relatifs -> pixels du canvas : x * s + ox, oy - y * s
+            var s = 256 * Math.pow(2, map.getZoom()) / (2 * %(half_world)r), origin = map.getPixelOrigin();
+            this._view = {
+                s: s, ratio: ratio, width: size.x, height: size.y,
+                ox: (this._arrays.origin[0] + %(half_world)r) * s - origin.x - this._topLeft.x,
+                oy: (%(half_world)r - this._arrays.origin[1]) * s - origin.y - this._topLeft.y
+            };
+            this.draw();
+        },
+
+        _animateZoom: function (e) {
+            var scale = this._map.getZoomScale(e.zoom),
+                offset = this._map._latLngBoundsToNewLayerBounds(this._bounds, e.zoom, e.center).min;
+            L.DomUtil.setTransform(this._canvas, offset, scale);
+        },
+
+        // Dessine les lignes visibles ; renvoie la durée du dessin (ms)
+        draw: function () {
+            var start = performance.now();
+            var a = this._arrays, v = this._view, s = v.s, ox = v.ox, oy = v.oy;
+            var coords = a.coords, offsets = a.offsets, boxes = a.boxes, widths = a.widths;
+            var ctx = this._canvas.getContext('2d');
+            ctx.setTransform(v.ratio, 0, 0, v.ratio, 0, 0);
+            ctx.clearRect(0, 0, v.width, v.height);
+            ctx.globalAlpha = this.options.opacity;
+            ctx.lineCap = 'round';
+            ctx.lineJoin = 'round';
+            // Fenêtre visible (plus une marge) en mètres relatifs
+            var margin = 16 / s, minX = -ox / s - margin, maxX = (v.width - ox) / s + margin,
+                minY = (oy - v.height) / s - margin, maxY = oy / s + margin;
+            for (var b = 0; b + 1 < this._batches.length; b++) {
+                ctx.beginPath();
+                for (var i = this._batches[b], end = this._batches[b + 1]; i < end; i++) {
+                    if (boxes[4 * i] > maxX || boxes[4 * i + 2] < minX || boxes[4 * i + 1] > maxY || boxes[4 * i + 3] < minY) {
+                        continue;
+                    }
+                    var j = offsets[i], k = offsets[i + 1];
+                    ctx.moveTo(ox + coords[2 * j] * s, oy - coords[2 * j + 1] * s);
+                    for (j++; j < k; j++) {
+                        ctx.lineTo(ox + coords[2 * j] * s, oy - coords[2 * j + 1] * s);
+                    }
+                }
+                ctx.strokeStyle = this._styles[b];
+                ctx.lineWidth = widths[this._batches[b]];
+                ctx.stroke();
+            }
+            return performance.now() - start;
+        },
+
+        // Popup de la ligne la plus proche du clic (à moins de tolerance pixels)
+        _click: function (e) {
+            if (!this.options.fields.length) {
+                return;
+            }
+            var a = this._arrays, v = this._view, s = v.s;
+            var px = (e.layerPoint.x - this._topLeft.x - v.ox) / s, py = (v.oy - e.layerPoint.y + this._topLeft.y) / s;
+            var tol = this.options.tolerance / s, best = tol * tol, found = -1;
+            for (var i = 0, n = a.widths.length; i < n; i++) {
+                if (a.boxes[4 * i] > px + tol || a.boxes[4 * i + 2] < px - tol ||
+                        a.boxes[4 * i + 1] > py + tol || a.boxes[4 * i + 3] < py - tol) {
+                    continue;
+                }
+                for (var j = a.offsets[i]; j + 1 < a.offsets[i + 1]; j++) {
+                    var x1 = a.coords[2 * j], y1 = a.coords[2 * j + 1];
+                    var dx = a.coords[2 * j + 2] - x1, dy = a.coords[2 * j + 3] - y1, len = dx * dx + dy * dy;
+                    var t = len > 0 ? Math.max(0, Math.min(1, ((px - x1) * dx + (py - y1) * dy) / len)) : 0;
+                    var ex = x1 + t * dx - px, ey = y1 + t * dy - py;
+                    if (ex * ex + ey * ey < best) {
+                        best = ex * ex + ey * ey;
+                        found = i;
+                    }
+                }
+            }
+            if (found < 0) {
+                return;
+            }
+            var feature = a.features[found], rows = '';
+            for (var f = 0; f < this.options.fields.length; f++) {
+                var value = a.properties[this.options.fields[f]][feature];
+                rows += '<tr><th>' + this.options.aliases[f] + '</th><td>' +
+                        (Number.isInteger(value) ? value : value.toFixed(2)) + '</td></tr>';
+            }
+            L.popup({maxWidth: 300}).setLatLng(e.latlng).setContent('<table>' + rows + '</table>').openOn(this._map);
+        }
+    });
+
+    // Tableaux transmis en base64 (petit-boutiste, comme numpy)
+    L.CanvasLines.decode = function (data) {
+        var decode = function (text, Type) {
+            var binary = atob(text), bytes = new Uint8Array(binary.length);
+            for (var i = 0; i < binary.length; i++) {
+                bytes[i] = binary.charCodeAt(i);
+            }
+            return new Type(bytes.buffer);
+        };
+        var properties = {};
+        for (var name in data.properties) {
+            properties[name] = decode(data.properties[name], Float32Array);
+        }
+        return {
+            origin: data.origin, coords: decode(data.coords, Float32Array), offsets: decode(data.offsets, Uint32Array),
+            boxes: decode(data.boxes, Float32Array), colors: decode(data.colors, Uint8Array),
+            widths: decode(data.widths, Float32Array), features: decode(data.features, Uint32Array),
+            properties: properties
+        };
+    };
+}
+""" % {'half_world': HALF_WORLD}
+
+def _b64(array, dtype):
+    return base64.b64encode(np.ascontiguousarray(array, dtype=np.dtype(dtype).newbyteorder("<")).tobytes()).decode()
+
+def _rgba(color):
+    """'#rrggbb' ou '#rrggbbaa' -> 4 octets."""
+    hex_color = color.lstrip("#")
+    return bytes.fromhex(hex_color if len(hex_color) == 8 else hex_color + "ff")
+
+def pack_lines(gdf, colors, widths, properties=()):
+    """
+    Tableaux typés (en base64) d'une couche de lignes, une entrée par ligne simple. Les lignes
+    sont triées par épaisseur puis couleur : les plus épaisses sont dessinées au-dessus et
+    celles de même style se suivent (un seul tracé canvas par style).
+    """
+    geometries = gdf.to_crs(epsg=3857).geometry.values
+    parts, feature = shapely.get_parts(geometries, return_index=True)
+    valid = shapely.get_num_coordinates(parts) >= 2
+    parts, feature = parts[valid], feature[valid]
+    rgba = np.frombuffer(b"".join(_rgba(c) for c in colors), dtype=np.uint8).reshape(-1, 4)
+    widths = np.asarray(widths, dtype=np.float32)
+    order = np.lexsort((rgba.view(np.uint32).ravel()[feature], widths[feature]))
+    parts, feature = parts[order], feature[order]
+
+    coords, index = shapely.get_coordinates(parts, return_index=True)
+    origin = coords.min(axis=0) if len(coords) else np.zeros(2)
+    relative = (coords - origin).astype(np.float32)
+    offsets = np.zeros(len(parts) + 1, dtype=np.uint32)
+    np.cumsum(np.bincount(index, minlength=len(parts)), out=offsets[1:])
+    starts = offsets[:-1].astype(np.int64)
+    boxes = np.column_stack([np.minimum.reduceat(relative, starts), np.maximum.reduceat(relative, starts)]) \
+        if len(parts) else np.zeros((0, 4), dtype=np.float32)
+    return {
+        'origin': origin.tolist(),
+        'coords': _b64(relative, np.float32),
+        'offsets': _b64(offsets, np.uint32),
+        'boxes': _b64(boxes, np.float32),
+        'colors': _b64(rgba[feature], np.uint8),
+        'widths': _b64(widths[feature], np.float32),
+        'features': _b64(feature, np.uint32),
+        'properties': {name: _b64(gdf[name].to_numpy(), np.float32) for name in properties},
+    }
+
+class CanvasLines(Layer):
+    """
+    Couche de lignes dessinée sur canvas (voir CANVAS_LINES_JS) : pas d'élément SVG ni de
+    fonction de style par segment. Un clic affiche les champs fields de la ligne la plus proche.
+    """
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+            {{ this.library }}
+            var {{ this.get_name() }} = new L.CanvasLines(
+                L.CanvasLines.decode({{ this.data|tojson }}),
+                {{ this.options|tojson }}
+            ).addTo({{ this._parent.get_name() }});
+        {% endmacro %}
+    """)
+
+    def __init__(self, gdf, colors, widths, fields=(), aliases=(), opacity=0.85, name=None, show=True):
+        super().__init__(name=name, overlay=True, control=True, show=show)
+        self._name = "CanvasLines"
+        self.library = CANVAS_LINES_JS
+        self.data = pack_lines(gdf, colors, widths, fields)
+        self.options = {'opacity': opacity, 'fields': list(fields), 'aliases': list(aliases or fields)}
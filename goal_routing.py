@@ -0,0 +1,145 @@
+import heapq
+import math
+import os
+import numpy as np
+from scipy.sparse.csgraph import dijkstra
+
+ENGINES = ('dijkstra', 'astar', 'alt')
+EARTH_RADIUS = 6_371_009
+LANDMARKS = 16
+# Distance « infinie » finie : inf - inf donnerait nan dans les bornes ALT
+FAR = 1e12
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Distance orthodromique en mètres (accepte des tableaux)."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(a))
+
+class GoalRouter:
+    """
+    Plus court chemin d'un couple (origine, destination) sur le graphe CSR, guidé par une
+    borne inférieure h(v) de la distance restante (h = 0 : Dijkstra classique).
+    Avec une heuristique cohérente, le chemin est le même que celui de Dijkstra.
+    """
+
+    def __init__(self, graph):
+        # Vues ndarray simples : le découpage d'un memmap est nettement plus lent
+        self.indptr = np.asarray(graph.indptr)
+        self.indices = np.asarray(graph.indices)
+        self.weights = np.asarray(graph.weights)
+        self.queries = 0
+        self.settled = 0
+
+    def heuristic(self, target):
+        """Fonction tableau de nœuds -> bornes inférieures de la distance jusqu'à target."""
+        return lambda nodes: np.zeros(len(nodes))
+
+    def path(self, source, target):
+        """Chemin en positions de nœuds, ou None si la destination est inatteignable."""
+        h = self.heuristic(target)
+        dist = {source: 0.0}
+        pred = {source: source}
+        heap = [(float(h(np.array([source]))[0]), 0.0, source)]
+        settled = set()
+        while heap:
+            _, d, v = heapq.heappop(heap)
+            if v in settled:
+                continue
+            settled.add(v)
+            if v == target:
+                break
+            start, end = self.indptr[v], self.indptr[v + 1]
+            neighbors = self.indices[start:end]
+            # Bornes calculées d'un bloc pour tous les voisins du nœud fixé
+            for w, length, estimate in zip(neighbors.tolist(), self.weights[start:end].tolist(), h(neighbors).tolist()):
+                candidate = d + length
+                if candidate < dist.get(w, math.inf):
+                    dist[w] = candidate
+                    pred[w] = v
+                    heapq.heappush(heap, (candidate + estimate, candidate, w))
+        self.queries += 1
+        self.settled += len(settled)
+        if target not in settled:
+            return None
+        path = [target]
+        while path[-1] != source:
+            path.append(pred[path[-1]])
+        path.reverse()
+        return path
+
+class AStarRouter(GoalRouter):
+    """A* : distance orthodromique jusqu'à la destination, réduite pour rester une borne inférieure."""
+
+    def __init__(self, graph, lat, lon):
+        super().__init__(graph)
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        # Facteur ≤ 1 tel que h(u) - h(v) ≤ longueur(u, v) sur toutes les arêtes (heuristique cohérente)
+        u = np.repeat(np.arange(len(graph.indptr) - 1), np.diff(graph.indptr))
+        straight = haversine(self.lat[u], self.lon[u], self.lat[graph.indices], self.lon[graph.indices])
+        ratios = np.asarray(graph.weights)[straight > 0] / straight[straight > 0]
+        self.scale = min(1.0, float(ratios.min()) if len(ratios) else 1.0) * (1 - 1e-9)
+
+    def heuristic(self, target):
+        # Un seul calcul vectorisé pour tout le graphe, moins coûteux que de petits calculs par nœud
+        bounds = self.scale * haversine(self.lat, self.lon, self.lat[target], self.lon[target])
+        return lambda nodes: bounds[nodes]
+
+class ALTRouter(GoalRouter):
+    """
+    ALT (A*, Landmarks, inégalité triangulaire) : table (n, 2k) des distances
+    depuis chaque repère L (d(L, v)) puis vers chaque repère (d(v, L)).
+    """
+
+    def __init__(self, graph, table):
+        super().__init__(graph)
+        self.table = np.asarray(table)
+        self.k = table.shape[1] // 2
+
+    def heuristic(self, target):
+        k, table = self.k, self.table
+        from_t, to_t = np.array(table[target, :k]), np.array(table[target, k:])
+
+        def h(nodes):
+            rows = table[nodes]
+            return np.maximum(0.0, np.maximum((from_t - rows[:, :k]).max(axis=1), (rows[:, k:] - to_t).max(axis=1)))
+        return h
+
+def landmark_table(graph, k=LANDMARKS, seed=0):
+    """Repères choisis par éloignement maximal (farthest point), puis distances aller et retour."""
+    n = len(graph.indptr) - 1
+    k = min(k, n)
+    reverse = graph.matrix.T.tocsr()
+    rng = np.random.default_rng(seed)
+    # Premier repère : le nœud le plus éloigné d'un nœud tiré au hasard
+    nearest = np.nan_to_num(dijkstra(graph.matrix, indices=int(rng.integers(n))), posinf=-1)
+    landmarks = []
+    for _ in range(k):
+        landmark = int(np.argmax(nearest))
+        landmarks.append(landmark)
+        distances = np.nan_to_num(dijkstra(graph.matrix, indices=landmark), posinf=-1)
+        nearest = distances if len(landmarks) == 1 else np.minimum(nearest, distances)
+        nearest[landmarks] = -1
+    forward = dijkstra(graph.matrix, indices=landmarks)
+    backward = dijkstra(reverse, indices=landmarks)
+    return np.minimum(np.concatenate([forward, backward]).T, FAR)
+
+def load_landmarks(graph, directory, k=LANDMARKS):
+    """Table des repères rangée à côté du graphe compilé, calculée au premier usage."""
+    path = os.path.join(directory, f"landmarks-{k}.npy")
+    if not os.path.exists(path):
+        print(f"📌 Calcul de {k} repères ALT...")
+        tmp = os.path.join(directory, f"landmarks-{k}.tmp.npy")
+        np.save(tmp, landmark_table(graph, k))
+        os.replace(tmp, path)
+    return np.load(path, mmap_mode="r")
+
+def make_router(engine, graph, directory):
+    """Moteur guidé du graphe compilé dans directory ; None pour Dijkstra (un arbre par origine)."""
+    if engine == 'astar':
+        return AStarRouter(graph, np.load(os.path.join(directory, "lat.npy"), mmap_mode="r"),
+                           np.load(os.path.join(directory, "lon.npy"), mmap_mode="r"))
+    if engine == 'alt':
+        return ALTRouter(graph, load_landmarks(graph, directory))
+    return None
@@ -0,0 +1,102 @@
+import json
+import os
+import shutil
+import numpy as np
+import shapely
+
+from cache_utils import cache_path
+from routing import ARRAYS, CSRGraph, compile_edges
+
+SNAPSHOT_VERSION = 2
+# Nœuds : identifiants OSM, WGS84 (lon, lat) et projection métrique (x, y) ;
+# arêtes (identifiant dense = rang dans G.edges, parallèles comprises) : extrémités en positions
+# de nœuds, clé OSM, géométrie projetée à plat (coords[offsets[e]:offsets[e + 1]]) ; plus le CSR
+SNAPSHOT_ARRAYS = ARRAYS + ('lon', 'lat', 'x', 'y', 'edge_u', 'edge_v', 'edge_key', 'geom_offsets', 'geom_coords')
+META_FILE = "meta.json"
+
+def snapshot_dir(graph_hash):
+    return cache_path(f"graph-{graph_hash[:16]}", "")
+
+class GraphSnapshot:
+    """
+    Graphe compilé une fois pour toutes dans cache/graph-<empreinte>/ :
+    tableaux .npy relus en memory-map, sans osmnx ni reprojection.
+    """
+
+    def __init__(self, directory, mmap_mode="r"):
+        self.directory = directory
+        with open(os.path.join(directory, META_FILE), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        for name in SNAPSHOT_ARRAYS:
+            setattr(self, name, np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode))
+        self.graph = CSRGraph(*(getattr(self, name) for name in ARRAYS))
+
+    @property
+    def crs(self):
+        return self.meta['crs']
+
+    def geometries(self, edges):
+        """LineString (projetées) des arêtes données, rassemblées en un seul appel vectorisé."""
+        starts, ends = self.geom_offsets[edges], self.geom_offsets[np.asarray(edges) + 1]
+        sizes = ends - starts
+        # Indices des points de chaque arête, bout à bout : starts[i], starts[i] + 1, ..., ends[i] - 1
+        parts = np.repeat(np.arange(len(sizes)), sizes)
+        points = np.repeat(starts - np.cumsum(sizes) + sizes, sizes) + np.arange(sizes.sum())
+        return shapely.linestrings(self.geom_coords[points], indices=parts)
+
+    def edge_nodes(self, edges):
+        """(u, v, clé) OSM des arêtes données."""
+        return self.node_ids[self.edge_u[edges]], self.node_ids[self.edge_v[edges]], self.edge_key[edges]
+
+    @classmethod
+    def exists(cls, directory):
+        path = os.path.join(directory, META_FILE)
+        if not os.path.exists(path):
+            return False
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get('version') == SNAPSHOT_VERSION
+
+def build_snapshot(G, G_proj, directory, graph_hash, weight='length'):
+    """Compile (G, G_proj) en tableaux binaires ; écrit dans un dossier temporaire puis renommé."""
+    node_ids = np.fromiter(G.nodes, dtype=np.int64, count=G.number_of_nodes())
+    index = {node: i for i, node in enumerate(node_ids.tolist())}
+    lon = np.array([G.nodes[n]['x'] for n in node_ids.tolist()], dtype=np.float64)
+    lat = np.array([G.nodes[n]['y'] for n in node_ids.tolist()], dtype=np.float64)
+    x = np.array([G_proj.nodes[n]['x'] for n in node_ids.tolist()], dtype=np.float64)
+    y = np.array([G_proj.nodes[n]['y'] for n in node_ids.tolist()], dtype=np.float64)
+
+    edges = list(G_proj.edges(keys=True, data=True))
+    u = np.array([index[a] for a, _, _, _ in edges], dtype=np.int32)
+    v = np.array([index[b] for _, b, _, _ in edges], dtype=np.int32)
+    keys = np.array([key for _, _, key, _ in edges], dtype=np.int32)
+    length = np.array([data.get(weight, 1.0) for _, _, _, data in edges], dtype=np.float64)
+    indptr, indices, weights, kept = compile_edges(len(node_ids), u, v, length)
+
+    # Géométrie projetée de chaque arête (segment droit à défaut)
+    coords = []
+    for e, (_, _, _, data) in enumerate(edges):
+        if 'geometry' in data:
+            coords.append(np.asarray(data['geometry'].coords, dtype=np.float64)[:, :2])
+        else:
+            coords.append(np.array([[x[u[e]], y[u[e]]], [x[v[e]], y[v[e]]]]))
+    geom_offsets = np.zeros(len(coords) + 1, dtype=np.int64)
+    np.cumsum([len(c) for c in coords], out=geom_offsets[1:])
+    geom_coords = np.concatenate(coords) if coords else np.empty((0, 2))
+
+    arrays = {
+        'node_ids': node_ids, 'indptr': indptr, 'indices': indices, 'weights': weights,
+        'edge_ids': kept.astype(np.int32), 'edge_lengths': length,
+        'lon': lon, 'lat': lat, 'x': x, 'y': y, 'edge_u': u, 'edge_v': v, 'edge_key': keys,
+        'geom_offsets': geom_offsets, 'geom_coords': geom_coords,
+    }
+    tmp = directory.rstrip(os.sep) + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for name in SNAPSHOT_ARRAYS:
+        np.save(os.path.join(tmp, f"{name}.npy"), arrays[name])
+    with open(os.path.join(tmp, META_FILE), "w", encoding="utf-8") as f:
+        json.dump({'version': SNAPSHOT_VERSION, 'graph_hash': graph_hash, 'crs': str(G_proj.graph['crs']),
+                   'nodes': len(node_ids), 'edges': len(edges)}, f)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp, directory.rstrip(os.sep))
+    return GraphSnapshot(directory)
@@ -0,0 +1,75 @@
+import hashlib
+import math
+import os
+import numpy as np
+from shapely.geometry import MultiPoint, box
+
+from cache_utils import cache_path, cached_digest
+from snapping import unique_stations
+
+# Tuiles de 0,02° (~2,2 km nord-sud, ~1,5 km est-ouest à Paris) du graphe régional
+TILE_DEG = 0.02
+MARGIN_M = 1000
+METERS_PER_DEGREE = 111_320
+
+def trip_extent(df, margin=MARGIN_M):
+    """Enveloppe convexe des stations des trajets, élargie de margin mètres (en degrés, côté prudent)."""
+    stations = unique_stations(df)
+    lats, lons = stations[:, 1], stations[:, 2]
+    # Un degré de longitude est plus court qu'un degré de latitude : on élargit d'après la longitude
+    margin_deg = margin / (METERS_PER_DEGREE * math.cos(math.radians(float(np.max(np.abs(lats))))))
+    return MultiPoint(np.column_stack([lons, lats])).convex_hull.buffer(margin_deg)
+
+def tile_bounds(i, j):
+    """(ouest, sud, est, nord) de la tuile (i, j)."""
+    return j * TILE_DEG, i * TILE_DEG, (j + 1) * TILE_DEG, (i + 1) * TILE_DEG
+
+def tiles_for(polygon):
+    """Tuiles (i = ligne de latitude, j = colonne de longitude) qui touchent le polygone."""
+    west, south, east, north = polygon.bounds
+    return [
+        (i, j)
+        for i in range(math.floor(south / TILE_DEG), math.floor(north / TILE_DEG) + 1)
+        for j in range(math.floor(west / TILE_DEG), math.floor(east / TILE_DEG) + 1)
+        if box(*tile_bounds(i, j)).intersects(polygon)
+    ]
+
+def tile_path(i, j):
+    return cache_path("tiles", f"bike-{i}_{j}.graphml")
+
+def fetch_tile(i, j):
+    """Télécharge une tuile une seule fois (graphe non simplifié, pour un raccord exact entre tuiles)."""
+    path = tile_path(i, j)
+    if os.path.exists(path):
+        return path
+    import osmnx as ox
+    import networkx as nx
+    from osmnx._errors import InsufficientResponseError
+
+    print(f"🌐 Téléchargement de la tuile {i}_{j}...")
+    try:
+        G = ox.graph_from_bbox(tile_bounds(i, j), network_type='bike', simplify=False, retain_all=True, truncate_by_edge=True)
+    except InsufficientResponseError:
+        # Tuile sans voie cyclable (Seine, bois...) : graphe vide, pour ne pas la redemander
+        G = nx.MultiDiGraph(crs="epsg:4326")
+    ox.save_graphml(G, path)
+    return path
+
+def extent_hash(tiles):
+    """Empreinte d'un ensemble de tuiles : nom et contenu de chacune."""
+    combined = hashlib.sha256()
+    for i, j in sorted(tiles):
+        combined.update(f"{i}_{j}:{cached_digest(tile_path(i, j))}".encode("utf-8"))
+    return combined.hexdigest()
+
+def stitch(tiles):
+    """
+    Assemble les tuiles (les nœuds OSM communs les raccordent, les arêtes de bord
+    présentes dans deux tuiles sont fusionnées), puis simplifie le graphe obtenu.
+    """
+    import osmnx as ox
+    import networkx as nx
+
+    G = nx.compose_all([ox.load_graphml(tile_path(i, j)) for i, j in tiles])
+    G.graph['crs'] = "epsg:4326"
+    return ox.simplify_graph(G)
@@ -0,0 +1,261 @@
+import hashlib
+import json
+import os
+
+import folium
+import numpy as np
+import shapely
+from branca.element import MacroElement
+from jinja2 import Template
+
+from cache_utils import cache_path
+
+LOD_VERSION = 1
+HALF_WORLD = 20037508.342789244  # demi-circonférence en Web Mercator (EPSG:3857)
+PIXEL_Z0 = 2 * HALF_WORLD / 256  # taille d'un pixel au zoom 0 (tuiles de 256 px), en mètres
+# Bandes de zoom (nom, zoom min, zoom max) : chaque bande est simplifiée au pixel de son zoom max
+ZOOM_BANDS = (("z0-12", 0, 12), ("z13-14", 13, 14), ("z15-18", 15, 18))
+# Grille fine (mètres) sur laquelle on repère les sommets communs à plusieurs géométries
+SNAP = 0.01
+
+def band_tolerance(max_zoom):
+    """Taille d'un pixel au zoom donné, en mètres Web Mercator."""
+    return PIXEL_Z0 / 2 ** max_zoom
+
+def _chains(geometry):
+    """(type TopoJSON, structure imbriquée de tableaux de points) d'une géométrie."""
+    if geometry is None or geometry.is_empty:
+        return None, None
+    kind = geometry.geom_type
+    if kind == "LineString":
+        return kind, np.asarray(geometry.coords)[:, :2]
+    if kind == "MultiLineString":
+        return kind, [np.asarray(line.coords)[:, :2] for line in geometry.geoms]
+    rings = lambda polygon: [np.asarray(ring.coords)[:, :2] for ring in (polygon.exterior, *polygon.interiors)]
+    if kind == "Polygon":
+        return kind, rings(geometry)
+    if kind == "MultiPolygon":
+        return kind, [rings(polygon) for polygon in geometry.geoms]
+    raise ValueError(f"Géométrie non prise en charge : {kind}")
+
+class _Topology:
+    """
+    Découpe des lignes et anneaux en arcs partagés : une frontière commune à deux quartiers
+    (ou une arête parcourue dans les deux sens) n'est stockée qu'une fois.
+    """
+
+    def __init__(self):
+        self.chains = []   # points sur la grille fine (entiers)
+        self.closed = []
+        self.arcs = []     # numéros de sommets (self.points) de chaque arc
+        self.index = {}
+
+    def add(self, points, closed):
+        self.chains.append(np.round(points / SNAP).astype(np.int64))
+        self.closed.append(closed)
+        return len(self.chains) - 1
+
+    def _arc(self, vertices):
+        """Numéro de l'arc (~numéro s'il est parcouru à l'envers), créé au besoin."""
+        key = vertices.tobytes()
+        if key in self.index:
+            return self.index[key]
+        reverse = vertices[::-1].tobytes()
+        if reverse in self.index:
+            return ~self.index[reverse]
+        self.index[key] = len(self.arcs)
+        self.arcs.append(vertices)
+        return self.index[key]
+
+    def build(self):
+        """Arcs de chaque chaîne, dans l'ordre d'ajout."""
+        sizes = np.array([len(chain) for chain in self.chains], dtype=np.int64)
+        points = np.concatenate(self.chains) if self.chains else np.empty((0, 2), dtype=np.int64)
+        chain_of = np.repeat(np.arange(len(sizes)), sizes)
+        # Sommets répétés à la suite (après calage sur la grille) : supprimés
+        keep = np.ones(len(points), dtype=bool)
+        keep[1:] = (points[1:] != points[:-1]).any(axis=1) | (chain_of[1:] != chain_of[:-1])
+        points, chain_of = points[keep], chain_of[keep]
+        offsets = np.searchsorted(chain_of, np.arange(len(sizes) + 1))
+        # Sommets communs : clé entière unique (x, y) -> un seul tri 1D, bien plus rapide qu'un unique par lignes
+        low = points.min(axis=0) if len(points) else np.zeros(2, dtype=np.int64)
+        width = int(points[:, 1].max() - low[1]) + 1 if len(points) else 1
+        keys, vertex = np.unique((points[:, 0] - low[0]) * width + (points[:, 1] - low[1]), return_inverse=True)
+        self.points = np.column_stack([keys // width + low[0], keys % width + low[1]])
+
+        # Segments (sommet i -> i + 1 d'une même chaîne), repérés sans tenir compte du sens
+        inner = np.flatnonzero(chain_of[:-1] == chain_of[1:])
+        a, b = vertex[inner], vertex[inner + 1]
+        _, segment = np.unique(np.minimum(a, b) * len(keys) + np.maximum(a, b), return_inverse=True)
+        # Signature de l'ensemble des chaînes qui passent par chaque segment : somme de poids aléatoires
+        weights = np.random.default_rng(0).integers(1, 2 ** 62, len(sizes), dtype=np.uint64)
+        owners = np.unique(np.column_stack([segment, chain_of[inner]]), axis=0)
+        signature = np.zeros(segment.max() + 1 if len(segment) else 0, dtype=np.uint64)
+        np.add.at(signature, owners[:, 0], weights[owners[:, 1]])
+        side = np.zeros(len(points), dtype=np.uint64)
+        side[inner] = signature[segment]
+        # Coupure là où l'ensemble des géométries qui partagent le segment change
+        cut = np.zeros(len(points), dtype=bool)
+        cut[1:-1] = (side[1:-1] != side[:-2]) & (chain_of[1:-1] == chain_of[:-2]) & (chain_of[1:-1] == chain_of[2:])
+
+        result = []
+        for c, closed in enumerate(self.closed):
+            start, end = offsets[c], offsets[c + 1]
+            vertices = vertex[start:end]
+            if len(vertices) < 2:
+                result.append([])
+                continue
+            cuts = np.flatnonzero(cut[start:end]).tolist()
+            if not closed:
+                cuts = [0] + cuts + [len(vertices) - 1]
+            elif side[start] != side[end - 2]:
+                cuts = [0] + cuts
+            ring = vertices[:-1]
+            if closed and not cuts:
+                # Anneau sans voisin : un seul arc, qui commence à son plus petit sommet
+                first = int(np.argmin(ring))
+                result.append([self._arc(np.concatenate([ring[first:], ring[:first + 1]]))])
+                continue
+            if closed:
+                vertices = np.concatenate([ring[cuts[0]:], ring[:cuts[0] + 1]])
+                cuts = [i - cuts[0] for i in cuts] + [len(ring)]
+            result.append([self._arc(vertices[i:j + 1]) for i, j in zip(cuts, cuts[1:])])
+        return result
+
+    def encode(self, tolerance):
+        """Arcs simplifiés à tolerance près, quantifiés en lon/lat et codés en différences."""
+        sizes = np.array([len(arc) for arc in self.arcs], dtype=np.int64)
+        vertices = np.concatenate(self.arcs)
+        lines = shapely.linestrings(self.points[vertices] * SNAP, indices=np.repeat(np.arange(len(sizes)), sizes))
+        simplified = shapely.simplify(lines, tolerance)
+        # Un anneau réduit à moins de 4 points ne serait plus un polygone : il garde son tracé complet
+        closed = vertices[np.cumsum(sizes) - sizes] == vertices[np.cumsum(sizes) - 1]
+        degenerate = closed & (shapely.get_num_coordinates(simplified) < 4)
+        simplified[degenerate] = lines[degenerate]
+        coords, parts = shapely.get_coordinates(simplified, return_index=True)
+        lon = coords[:, 0] * 180 / HALF_WORLD
+        lat = np.degrees(2 * np.arctan(np.exp(coords[:, 1] * np.pi / HALF_WORLD)) - np.pi / 2)
+        # Pas de la grille : moitié de la tolérance (exact en longitude, plus fin en latitude)
+        scale = tolerance / 2 * 180 / HALF_WORLD
+        translate = np.array([lon.min(), lat.min()])
+        quantized = np.round((np.column_stack([lon, lat]) - translate) / scale).astype(np.int64)
+        starts = np.zeros(len(parts), dtype=bool)
+        starts[np.searchsorted(parts, np.arange(len(self.arcs)))] = True
+        deltas = quantized.copy()
+        deltas[1:] -= quantized[:-1]
+        deltas[starts] = quantized[starts]
+        # Points confondus après quantification : supprimés
+        keep = starts | (deltas != 0).any(axis=1)
+        offsets = np.searchsorted(parts[keep], np.arange(1, len(self.arcs)))
+        arcs = [arc.tolist() for arc in np.split(deltas[keep], offsets)]
+        # Un arc TopoJSON a au moins deux positions
+        arcs = [arc if len(arc) > 1 else arc + [[0, 0]] for arc in arcs]
+        return arcs, [scale, scale], translate.tolist()
+
+def _digest(layers, properties, bands):
+    digest = hashlib.sha256(json.dumps([LOD_VERSION, SNAP, bands]).encode())
+    for name, gdf in layers.items():
+        digest.update(name.encode())
+        digest.update(b"".join(shapely.to_wkb(np.asarray(gdf.geometry.values))))
+        digest.update(json.dumps({col: gdf[col].tolist() for col in properties.get(name, ())}, default=str).encode())
+    return digest.hexdigest()
+
+def topologies(layers, properties, bands=ZOOM_BANDS):
+    """
+    TopoJSON de chaque bande de zoom ({nom de bande: topologie}) pour des couches
+    {nom: GeoDataFrame}, avec les colonnes properties[nom] de chaque couche.
+    Calculées une fois par contenu et gardées dans cache/lod/.
+    """
+    digest = _digest(layers, properties, bands)
+    paths = {name: cache_path("lod", f"{digest[:16]}-{name}.json") for name, _, _ in bands}
+    if all(os.path.exists(path) for path in paths.values()):
+        result = {}
+        for name, path in paths.items():
+            with open(path, "r", encoding="utf-8") as f:
+                result[name] = json.load(f)
+        return result
+
+    topology = _Topology()
+    objects = {}
+    for name, gdf in layers.items():
+        columns = {col: gdf[col].tolist() for col in properties.get(name, ())}
+        geometries = []
+        for i, geometry in enumerate(gdf.to_crs(epsg=3857).geometry.values):
+            kind, chains = _chains(geometry)
+            if kind == "LineString":
+                chains = topology.add(chains, False)
+            elif kind == "Polygon":
+                chains = [topology.add(ring, True) for ring in chains]
+            elif kind == "MultiLineString":
+                chains = [topology.add(line, False) for line in chains]
+            elif kind == "MultiPolygon":
+                chains = [[topology.add(ring, True) for ring in polygon] for polygon in chains]
+            geometries.append((kind, chains, {col: values[i] for col, values in columns.items()}))
+        objects[name] = geometries
+    arcs_of = topology.build()
+
+    def arcs(chains):
+        return arcs_of[chains] if isinstance(chains, int) else [arcs(c) for c in chains]
+
+    collections = {
+        name: {'type': "GeometryCollection", 'geometries': [
+            {'type': kind, 'arcs': arcs(chains), 'properties': props} if kind else {'type': None, 'properties': props}
+            for kind, chains, props in geometries
+        ]}
+        for name, geometries in objects.items()
+    }
+    result = {}
+    for name, _, max_zoom in bands:
+        encoded, scale, translate = topology.encode(band_tolerance(max_zoom))
+        text = json.dumps({'type': "Topology", 'transform': {'scale': scale, 'translate': translate},
+                           'objects': collections, 'arcs': encoded}, separators=(",", ":"))
+        tmp = paths[name] + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, paths[name])
+        # Copie indépendante par bande : folium ajoute le style dans les propriétés de chaque couche
+        result[name] = json.loads(text)
+    return result
+
+class ZoomBands(MacroElement):
+    """Ne garde dans le groupe parent que la couche de la bande de zoom courante."""
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        (function() {
+            var map = {{ this.map.get_name() }};
+            var group = {{ this._parent.get_name() }};
+            var bands = [{% for layer, zmin, zmax in this.bands %}[{{ layer.get_name() }}, {{ zmin }}, {{ zmax }}],{% endfor %}];
+            function update() {
+                var zoom = map.getZoom();
+                bands.forEach(function(band) {
+                    if (zoom >= band[1] && zoom <= band[2]) { group.addLayer(band[0]); }
+                    else { group.removeLayer(band[0]); }
+                });
+            }
+            map.on('zoomend', update);
+            update();
+        })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, map, bands):
+        super().__init__()
+        self._name = "ZoomBands"
+        self.map = map
+        self.bands = bands  # [(couche, zoom min, zoom max), ...]
+
+def add_banded_layers(group, map, topos, object_name, style_function, tooltip=None, popup=None, bands=ZOOM_BANDS):
+    """
+    Une couche TopoJSON par bande de zoom dans group (tooltip, popup : fabriques appelées
+    pour chaque couche) ; seule la couche de la bande courante reste affichée.
+    """
+    layers = []
+    for name, zmin, zmax in bands:
+        layer = folium.TopoJson(topos[name], f"objects.{object_name}", style_function=style_function,
+                                control=False, tooltip=tooltip() if tooltip else None)
+        if popup:
+            layer.add_child(popup())
+        layer.add_to(group)
+        layers.append((layer, zmin, zmax))
+    ZoomBands(map, layers).add_to(group)
@@ -0,0 +1,157 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from cache_utils import file_digest, cache_path
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STATE_FILE = cache_path("pipeline.json")
+
+# Chaque étape déclare ses entrées (données + code) et ses sorties
+STAGES = {
+    'install': {
+        'cmd': [sys.executable, "-m", "pip", "install", "-r", "requirements.txt"],
+        'inputs': ["requirements.txt"],
+        'outputs': [],
+        'deps': [],
+    },
+    'analyze': {
+        'cmd': [sys.executable, "analyze.py"],
+        'cwd': "api",
+        'inputs': ["api/data.txt", "api/*.py"],
+        'outputs': ["data/trajets.npy", "output/statistiques.txt", "output/statistiques.json"],
+        'deps': ['install'],
+    },
+    'road': {
+        'cmd': [sys.executable, "road.py"],
+        'inputs': ["data/trajets.npy", "ressources/*.graphml", "road.py", "snapping.py", "route_cache.py", "routing.py", "graph_snapshot.py", "graph_tiles.py", "goal_routing.py", "usage_cube.py", "trip_routes.py", "cache_utils.py"],
+        'outputs': ["data/trajects.geojson", "data/usage_cube.npz", "data/trip_routes.npz"],
+        'deps': ['analyze'],
+    },
+    'map': {
+        'cmd': [sys.executable, "web-maker.py"],
+        'inputs': ["data/trajects.geojson", "data/trip_routes.npz", "output/statistiques.json",
+                   "ressources/quartiers.geojson", "ressources/velib-emplacement-des-stations.csv", "web-maker.py",
+                   "vector_tiles.py", "map_lod.py", "quartier_usage.py", "canvas_layer.py"],
+        'outputs': ["output/carte_interactive.html"],
+        'deps': ['road'],
+    },
+    'dashboard': {
+        'cmd': [sys.executable, "stats.py"],
+        'inputs': ["output/statistiques.json", "stats.py"],
+        'outputs': ["output/dashboard_stats.html"],
+        'deps': ['analyze'],
+    },
+}
+
+def load_state():
+    try:
+        with open(STATE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'files': {}, 'stages': {}}
+
+def save_state(state):
+    with open(STATE_FILE, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+
+def _digest(path, files):
+    """Empreinte d'un fichier, recalculée seulement si sa taille ou sa date ont changé."""
+    stat = os.stat(path)
+    known = files.get(path)
+    if known and known[0] == stat.st_size and known[1] == stat.st_mtime_ns:
+        return known[2]
+    digest = file_digest(path)
+    files[path] = [stat.st_size, stat.st_mtime_ns, digest]
+    return digest
+
+def stage_hash(stage, files):
+    """Empreinte combinée des entrées d'une étape (une entrée absente compte aussi)."""
+    combined = hashlib.sha256(" ".join(stage['cmd'][1:]).encode("utf-8"))
+    for pattern in stage['inputs']:
+        paths = sorted(glob.glob(os.path.join(ROOT, pattern)))
+        if not paths:
+            combined.update(f"{pattern}:absent".encode("utf-8"))
+        for path in paths:
+            combined.update(f"{os.path.relpath(path, ROOT)}:{_digest(path, files)}".encode("utf-8"))
+    return combined.hexdigest()
+
+def is_up_to_date(name, stage, state, digest):
+    outputs_exist = all(os.path.exists(os.path.join(ROOT, path)) for path in stage['outputs'])
+    return outputs_exist and state['stages'].get(name) == digest
+
+def run_stage(name, stage):
+    start = time.time()
+    result = subprocess.run(stage['cmd'], cwd=os.path.join(ROOT, stage.get('cwd', "")))
+    return result.returncode, time.time() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Exécute les étapes du pipeline Vélib' qui ne sont pas à jour.")
+    parser.add_argument("--force", action="store_true", help="Relance toutes les étapes")
+    parser.add_argument("--skip-install", action="store_true", help="N'installe pas les dépendances")
+    parser.add_argument("--workers", type=int, default=2, help="Étapes indépendantes exécutées en parallèle")
+    args = parser.parse_args()
+
+    stages = {name: dict(stage) for name, stage in STAGES.items()}
+    if args.skip_install:
+        del stages['install']
+        for stage in stages.values():
+            stage['deps'] = [dep for dep in stage['deps'] if dep != 'install']
+
+    state = load_state()
+    pending = dict(stages)
+    done, failed, timings = set(), set(), {}
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        while pending or running:
+            for name, stage in list(pending.items()):
+                if any(dep in failed for dep in stage['deps']):
+                    print(f"⏭️  {name} : étape précédente en échec, ignorée")
+                    failed.add(name)
+                    del pending[name]
+                    continue
+                if not all(dep in done for dep in stage['deps']):
+                    continue
+                del pending[name]
+                # Les entrées sont hachées une fois les étapes précédentes terminées
+                digest = stage_hash(stage, state['files'])
+                if not args.force and is_up_to_date(name, stage, state, digest):
+                    print(f"✅ {name} : à jour, ignorée")
+                    timings[name] = None
+                    done.add(name)
+                    continue
+                print(f"🚀 {name} : lancement...")
+                running[pool.submit(run_stage, name, stage)] = (name, digest)
+
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name, digest = running.pop(future)
+                returncode, elapsed = future.result()
+                timings[name] = elapsed
+                if returncode != 0:
+                    print(f"❌ {name} : échec (code {returncode})")
+                    failed.add(name)
+                    continue
+                done.add(name)
+                state['stages'][name] = digest
+                save_state(state)
+
+    save_state(state)
+    print("\n⏱️  Temps par étape :")
+    for name in stages:
+        elapsed = timings.get(name)
+        status = "échec" if name in failed else ("ignorée" if elapsed is None else f"{elapsed:.1f}s")
+        print(f"  {name:<10} {status}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+import hashlib
+import os
+import numpy as np
+import shapely
+from scipy.sparse import coo_matrix, csr_matrix, diags
+from shapely import STRtree
+
+from graph_snapshot import GraphSnapshot, snapshot_dir
+from trip_routes import ROUTES_FILE
+
+QUARTIERS_FILE = "ressources/quartiers.geojson"
+
+class QuartierAssignment:
+    """
+    Longueur (mètres) de chaque arête dans chaque quartier : matrice creuse (arêtes x quartiers),
+    calculée une fois par découpage des arêtes aux contours. Une nouvelle série de trajets
+    ne coûte plus qu'un produit matrice creuse - vecteur de passages.
+    """
+
+    def __init__(self, matrix, lengths):
+        self.matrix = matrix
+        self.lengths = lengths
+
+    @classmethod
+    def build(cls, lines, polygons):
+        """lines, polygons : géométries shapely dans une même projection métrique."""
+        lines, polygons = np.asarray(lines), np.asarray(polygons)
+        # Un seul passage sur l'index : couples (quartier, arête) qui se touchent
+        shapely.prepare(polygons)
+        quartier, edge = STRtree(lines).query(polygons, predicate="intersects")
+        # Seules les arêtes qui traversent un contour sont découpées ; les autres y sont en entier
+        inside = shapely.length(lines[edge])
+        crossing = ~shapely.contains_properly(polygons[quartier], lines[edge])
+        inside[crossing] = shapely.length(shapely.intersection(lines[edge[crossing]], polygons[quartier[crossing]]))
+        kept = inside > 0
+        matrix = coo_matrix((inside[kept], (edge[kept], quartier[kept])), shape=(len(lines), len(polygons))).tocsr()
+        return cls(matrix, shapely.length(lines))
+
+    @classmethod
+    def for_snapshot(cls, snapshot, quartiers):
+        """Affectation de toutes les arêtes du graphe compilé, gardée à côté de lui (une par jeu de quartiers)."""
+        polygons = quartiers.to_crs(snapshot.crs).geometry.values
+        digest = hashlib.sha256(b"".join(shapely.to_wkb(np.asarray(polygons)))).hexdigest()
+        path = os.path.join(snapshot.directory, f"quartiers-{digest[:16]}.npz")
+        if os.path.exists(path):
+            return cls.load(path)
+        assignment = cls.build(snapshot.geometries(np.arange(snapshot.graph.edge_count)), polygons)
+        tmp = path[:-len(".npz")] + ".tmp.npz"
+        assignment.save(tmp)
+        os.replace(tmp, path)
+        return assignment
+
+    def save(self, path):
+        np.savez(path, data=self.matrix.data, indices=self.matrix.indices, indptr=self.matrix.indptr,
+                 shape=np.array(self.matrix.shape), lengths=self.lengths)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as f:
+            return cls(csr_matrix((f['data'], f['indices'], f['indptr']), shape=tuple(f['shape'])), f['lengths'])
+
+    def shares(self):
+        """Part de la longueur de chaque arête dans chaque quartier (arêtes x quartiers)."""
+        # Bornée à 1 par arête : une arête tracée sur une frontière touche les deux quartiers
+        totals = np.maximum(self.lengths, np.asarray(self.matrix.sum(axis=1)).ravel())
+        return diags(1 / totals.clip(min=1e-9)) @ self.matrix
+
+    def trips(self, usage):
+        """
+        Passages par quartier, chaque arête comptant pour la part de sa longueur dans le quartier
+        (une longue arête à cheval sur deux quartiers n'est plus comptée en entier dans chacun).
+        """
+        return self.shares().T @ np.asarray(usage, dtype=np.float64)
+
+    def km(self, usage):
+        """Kilomètres parcourus dans chaque quartier pour des passages par arête."""
+        return self.shares().T @ (np.asarray(usage, dtype=np.float64) * self.lengths) / 1000
+
+def for_trajects(gdf, quartiers, routes_file=ROUTES_FILE):
+    """
+    (affectation, passages par arête) pour les segments de trajects.geojson : sur le graphe compilé
+    de road.py quand il est disponible (affectation en cache), sinon sur les géométries des segments.
+    """
+    if 'edge_id' in gdf and os.path.exists(routes_file):
+        with np.load(routes_file) as f:
+            directory = snapshot_dir(str(f['graph_hash']))
+        if GraphSnapshot.exists(directory):
+            snapshot = GraphSnapshot(directory)
+            usage = np.bincount(gdf['edge_id'].to_numpy(), weights=gdf['count'].to_numpy(),
+                                minlength=snapshot.graph.edge_count)
+            return QuartierAssignment.for_snapshot(snapshot, quartiers), usage
+    lines = gdf.to_crs(gdf.estimate_utm_crs())
+    assignment = QuartierAssignment.build(lines.geometry.values, quartiers.to_crs(lines.crs).geometry.values)
+    return assignment, gdf['count'].to_numpy()
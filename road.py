@@ -1,75 +1,194 @@
+import argparse
 import os
-import osmnx as ox
-import networkx as nx
+import numpy as np
 import pandas as pd
 import geopandas as gpd
-from shapely.geometry import LineString
-from collections import defaultdict
-
-# Configuration OSMNX
-ox.settings.log_console = True
-ox.settings.use_cache = True
-
-# === Étape 1 : Charger les données de trajets ===
-print("📥 Chargement des données de trajets...")
-df = pd.read_csv("data/coordonnees.csv")  # Colonnes attendues : lat_start, lon_start, lat_end, lon_end
-print(f"✅ {len(df)} trajets chargés.")
-
-# === Étape 2 : Charger ou télécharger le graphe OSM ===
-graph_filename = "ressources/paris_bike_10km.graphml"
-
-if os.path.exists(graph_filename):
-    print("📂 Chargement du graphe cyclable depuis le fichier local...")
-    G = ox.load_graphml(graph_filename)
-else:
-    print("🌐 Téléchargement du graphe cyclable depuis OpenStreetMap...")
-    city_center = (48.8566, 2.3522)  # Paris centre
-    G = ox.graph_from_point(city_center, dist=10000, network_type='bike')
-    ox.save_graphml(G, graph_filename)
-    print(f"✅ Graphe sauvegardé sous {graph_filename}")
-
-# Projeter le graphe pour des mesures précises
-G_proj = ox.project_graph(G)
-
-# === Étape 3 : Calcul des itinéraires ===
-print("🚴 Calcul des itinéraires vélo...")
-edge_usage = defaultdict(int)
-total = len(df)
-
-for idx, row in df.iterrows():
-    try:
-        # Nearest nodes doivent être appelés sur un graphe non projeté
-        orig = ox.nearest_nodes(G, row['lon_start'], row['lat_start'])
-        dest = ox.nearest_nodes(G, row['lon_end'], row['lat_end'])
-        path = nx.shortest_path(G, orig, dest, weight='length')
-        for u, v in zip(path[:-1], path[1:]):
-            edge_usage[(u, v)] += 1
-    except Exception as e:
-        print(f"❌ Trajet {idx+1}/{total} ignoré (erreur : {e})")
-
-print(f"✅ {len(edge_usage)} segments utilisés au total.")
-
-# === Étape 4 : Construction des géométries GeoJSON ===
-print("🧱 Création des géométries pour GeoJSON...")
-features = []
-
-for (u, v), count in edge_usage.items():
-    try:
-        data = G_proj.get_edge_data(u, v)[0]
-        geom = data['geometry'] if 'geometry' in data else LineString([
-            (G_proj.nodes[u]['x'], G_proj.nodes[u]['y']),
-            (G_proj.nodes[v]['x'], G_proj.nodes[v]['y'])
-        ])
-        features.append({'geometry': geom, 'count': count})
-    except Exception as e:
-        print(f"⚠️ Erreur sur le segment ({u}, {v}): {e}")
-
-# Création du GeoDataFrame avec géométrie
-gdf = gpd.GeoDataFrame(features, geometry="geometry")
-gdf.set_crs(G_proj.graph['crs'], inplace=True)
-
-# === Étape 5 : Export GeoJSON ===
-output_file = "data/trajects.geojson"
-print(f"💾 Sauvegarde dans '{output_file}'...")
-gdf.to_file(output_file, driver="GeoJSON")
-print(f"✅ Fichier GeoJSON généré avec {len(gdf)} lignes.")
+from collections import Counter
+
+from cache_utils import cached_digest
+from snapping import station_nodes
+from route_cache import RouteCache, NO_ROUTE
+from graph_tiles import MARGIN_M, extent_hash, fetch_tile, stitch, tiles_for, trip_extent
+from graph_snapshot import GraphSnapshot, build_snapshot, snapshot_dir
+from goal_routing import ENGINES
+from routing import route_usage
+from trip_routes import ROUTES_FILE, TripRoutes
+from usage_cube import CUBE_FILE, UsageCube
+
+GRAPH_FILENAME = "ressources/paris_bike_10km.graphml"
+TRIPS_FILE = "data/trajets.npy"
+COORD_COLUMNS = ['lat_start', 'lon_start', 'lat_end', 'lon_end']
+STATION_COLUMNS = ['departure', 'arrival']
+
+def load_trips(trips_file=TRIPS_FILE):
+    """Lit uniquement les colonnes stations et coordonnées de la table des trajets (memory-map)."""
+    trips = np.load(trips_file, mmap_mode="r")
+    df = pd.DataFrame({column: trips[column].astype(np.float64) for column in COORD_COLUMNS})
+    for column in STATION_COLUMNS:
+        df[column] = trips[column].astype(np.int64)
+    return df.dropna()
+
+def load_graph(graph_filename=GRAPH_FILENAME):
+    """Charge (ou télécharge) le graphe cyclable et sa version projetée."""
+    # osmnx n'est importé que pour (re)compiler le graphe : son import seul prend plusieurs secondes
+    import osmnx as ox
+    ox.settings.log_console = True
+    ox.settings.use_cache = True
+
+    if os.path.exists(graph_filename):
+        print("📂 Chargement du graphe cyclable depuis le fichier local...")
+        G = ox.load_graphml(graph_filename)
+    else:
+        print("🌐 Téléchargement du graphe cyclable depuis OpenStreetMap...")
+        city_center = (48.8566, 2.3522)  # Paris centre
+        G = ox.graph_from_point(city_center, dist=10000, network_type='bike')
+        ox.save_graphml(G, graph_filename)
+        print(f"✅ Graphe sauvegardé sous {graph_filename}")
+
+    # Projeter le graphe pour des mesures précises
+    G_proj = ox.project_graph(G)
+    return G, G_proj
+
+def load_snapshot(graph_filename=GRAPH_FILENAME):
+    """
+    Graphe compilé (memory-map) de la version courante du graphml ; la première fois,
+    ou quand le graphml change, il est chargé par osmnx, projeté puis compilé dans cache/.
+    Renvoie (snapshot, empreinte du graphml).
+    """
+    graph_hash = cached_digest(graph_filename) if os.path.exists(graph_filename) else None
+    if graph_hash is None or not GraphSnapshot.exists(snapshot_dir(graph_hash)):
+        G, G_proj = load_graph(graph_filename)
+        graph_hash = cached_digest(graph_filename)
+        directory = snapshot_dir(graph_hash)
+        print("🗜️ Compilation du graphe dans cache/...")
+        build_snapshot(G, G_proj, directory, graph_hash)
+    else:
+        print("📂 Chargement du graphe compilé depuis le cache...")
+    return GraphSnapshot(snapshot_dir(graph_hash)), graph_hash
+
+def load_extent_snapshot(df, margin=MARGIN_M):
+    """
+    Graphe compilé limité à l'emprise des trajets (enveloppe convexe des stations + marge) :
+    assemblage des tuiles du graphe régional qui la touchent, téléchargées une seule fois.
+    Renvoie (snapshot, empreinte de l'ensemble de tuiles).
+    """
+    tiles = tiles_for(trip_extent(df, margin))
+    print(f"🧩 Emprise des trajets : {len(tiles)} tuiles de graphe.")
+    for tile in tiles:
+        fetch_tile(*tile)
+    graph_hash = extent_hash(tiles)
+    directory = snapshot_dir(graph_hash)
+    if not GraphSnapshot.exists(directory):
+        import osmnx as ox
+        print("🧵 Assemblage des tuiles...")
+        G = stitch(tiles)
+        print("🗜️ Compilation du graphe dans cache/...")
+        build_snapshot(G, ox.project_graph(G), directory, graph_hash)
+    else:
+        print("📂 Chargement du graphe compilé depuis le cache...")
+    return GraphSnapshot(directory), graph_hash
+
+def compute_edge_usage(graph, df, nodes, cache, workers=1, directory=None, engine='dijkstra'):
+    """
+    Calcule l'itinéraire de chaque couple (origine, destination) distinct et
+    compte les passages par identifiant d'arête. Les itinéraires connus sont lus dans le cache,
+    les autres calculés sur le graphe compilé (moteur engine), en parallèle si workers > 1.
+    Renvoie l'usage par arête et l'itinéraire de chaque trajet (dans l'ordre de df).
+    """
+    print("🚴 Calcul des itinéraires vélo...")
+    origins = [nodes.get(station) for station in df['departure']]
+    destinations = [nodes.get(station) for station in df['arrival']]
+    pairs = Counter(zip(origins, destinations))
+
+    usage = np.zeros(graph.edge_count, dtype=np.int64)
+    known, missing = {}, {}
+    for pair, count in pairs.items():
+        path = cache.get(*pair)
+        if path is None:
+            missing[pair] = count
+        else:
+            known[pair] = path
+            np.add.at(usage, path, count)
+
+    routes, computed = route_usage(graph, missing, workers=workers, directory=directory, engine=engine)
+    usage += computed
+    for pair, path in routes.items():
+        if path is None:
+            print(f"❌ {pairs[pair]} trajet(s) {pair[0]} -> {pair[1]} ignoré(s) (aucun itinéraire)")
+            path = NO_ROUTE
+        known[pair] = cache.put(*pair, path)
+
+    cache.save()
+    print(f"✅ {len(pairs)} couples de stations, {len(pairs) - len(missing)} itinéraires lus dans le cache.")
+    print(f"✅ {np.count_nonzero(usage)} segments utilisés au total.")
+    return usage, [known[pair] for pair in zip(origins, destinations)]
+
+def build_geodataframe(snapshot, usage):
+    """Construit les géométries des segments utilisés, lues d'un bloc dans le graphe compilé."""
+    print("🧱 Création des géométries pour GeoJSON...")
+    used = np.flatnonzero(usage)
+    gdf = gpd.GeoDataFrame({'edge_id': used, 'count': usage[used]}, geometry=snapshot.geometries(used), crs=snapshot.crs)
+    return gdf
+
+def run(trips_file=TRIPS_FILE, output_file="data/trajects.geojson", snapshot=None, graph_filename=GRAPH_FILENAME, workers=1,
+        extent="fixed", margin=MARGIN_M, engine='dijkstra'):
+    """
+    Exécute l'étape complète trajets.npy -> trajects.geojson.
+    extent="trips" remplace le graphe fixe de Paris par l'emprise des trajets (tuiles en cache).
+    engine choisit le moteur de plus court chemin ('dijkstra', 'astar' ou 'alt', mêmes chemins).
+    workers > 1 répartit le calcul des itinéraires sur plusieurs processus.
+    Renvoie l'usage des segments {(u, v, clé): nombre de passages}.
+    """
+    # === Étape 1 : Charger les données de trajets ===
+    print("📥 Chargement des données de trajets...")
+    df = load_trips(trips_file)
+    print(f"✅ {len(df)} trajets chargés.")
+
+    # === Étape 2 : Graphe compilé (cache/), construit depuis le graphml OSM ou les tuiles si besoin ===
+    if snapshot is None:
+        snapshot = load_extent_snapshot(df, margin) if extent == "trips" else load_snapshot(graph_filename)
+    snapshot, graph_hash = snapshot
+
+    # === Étape 3 : Recalage des stations (nœuds les plus proches, coordonnées WGS84) ===
+    nodes = station_nodes(snapshot, df, graph_hash)
+
+    # === Étape 4 : Calcul des itinéraires (cache par couple de nœuds et version du graphe) ===
+    usage, routes = compute_edge_usage(snapshot.graph, df, nodes, RouteCache(graph_hash), workers=workers,
+                                       directory=snapshot.directory, engine=engine)
+
+    # === Étape 5 : Itinéraire de chaque trajet (tableau irrégulier indexé par ligne de trajets.npy) ===
+    data_dir = os.path.dirname(output_file)
+    starts = np.asarray(np.load(trips_file, mmap_mode="r")['start'])
+    trip_routes = TripRoutes.from_routes(df.index.to_numpy(), routes, len(starts), graph_hash)
+    trip_routes.save(os.path.join(data_dir, os.path.basename(ROUTES_FILE)))
+
+    # === Étape 6 : Cube arêtes x créneaux (mois, jour, heure) pour les filtres temporels ===
+    cube_file = os.path.join(data_dir, os.path.basename(CUBE_FILE))
+    cube = UsageCube.build(trip_routes, starts, snapshot.graph.edge_count)
+    cube.save(cube_file)
+    print(f"🗓️ Itinéraires par trajet et cube d'usage ({len(cube.months)} mois) enregistrés dans '{data_dir or '.'}'.")
+
+    # === Étape 7 : Construction des géométries GeoJSON ===
+    gdf = build_geodataframe(snapshot, usage)
+
+    # === Étape 8 : Export GeoJSON ===
+    print(f"💾 Sauvegarde dans '{output_file}'...")
+    gdf.to_file(output_file, driver="GeoJSON")
+    print(f"✅ Fichier GeoJSON généré avec {len(gdf)} lignes.")
+    used = np.flatnonzero(usage)
+    u, v, key = snapshot.edge_nodes(used)
+    return dict(zip(zip(u.tolist(), v.tolist(), key.tolist()), usage[used].tolist()))
+
+def main():
+    parser = argparse.ArgumentParser(description="Calcul des itinéraires : trajets.npy -> trajects.geojson")
+    parser.add_argument("--workers", type=int, default=1, help="Processus de calcul des itinéraires")
+    parser.add_argument("--extent", choices=["fixed", "trips"], default="fixed",
+                        help="Graphe fixe de Paris (10 km) ou emprise des stations des trajets")
+    parser.add_argument("--margin", type=float, default=MARGIN_M, help="Marge autour des stations en mode trips (m)")
+    parser.add_argument("--engine", choices=ENGINES, default='dijkstra',
+                        help="Dijkstra (un arbre par origine), A* (heuristique haversine) ou ALT (repères précalculés)")
+    args = parser.parse_args()
+    run(workers=args.workers, extent=args.extent, margin=args.margin, engine=args.engine)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import os
+import pickle
+from collections import OrderedDict
+import numpy as np
+
+from cache_utils import cache_path
+
+MAX_ENTRIES = 100_000
+# Format des itinéraires (2 : identifiants d'arêtes du graphe compilé)
+ROUTE_FORMAT = 2
+NO_ROUTE = np.empty(0, dtype=np.int32)
+
+class RouteCache:
+    """
+    Cache disque des itinéraires : (nœud origine, nœud destination) -> identifiants d'arêtes (int32).
+    Un fichier par version de graphe (empreinte du graphml) ; les plus anciennes
+    entrées sont évincées au-delà de max_entries.
+    """
+
+    def __init__(self, graph_hash, max_entries=MAX_ENTRIES):
+        self.path = cache_path(f"routes-{graph_hash[:16]}-v{ROUTE_FORMAT}.pkl")
+        self.max_entries = max_entries
+        self.routes = OrderedDict()
+        self.dirty = False
+        self.hits = 0
+        self.misses = 0
+        if os.path.exists(self.path):
+            with open(self.path, "rb") as f:
+                self.routes = pickle.load(f)
+
+    def get(self, orig, dest):
+        route = self.routes.get((orig, dest))
+        if route is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.routes.move_to_end((orig, dest))
+        return route
+
+    def put(self, orig, dest, path):
+        """Enregistre un itinéraire (une liste vide signifie « pas d'itinéraire »)."""
+        route = np.asarray(path, dtype=np.int32)
+        self.routes[(orig, dest)] = route
+        self.routes.move_to_end((orig, dest))
+        while len(self.routes) > self.max_entries:
+            self.routes.popitem(last=False)
+        self.dirty = True
+        return route
+
+    def save(self):
+        if not self.dirty:
+            return
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(self.routes, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.path)
+        self.dirty = False
@@ -0,0 +1,202 @@
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+from goal_routing import make_router
+
+# Selon les versions, csgraph ignore les zéros explicites : poids minimal négligeable
+MIN_WEIGHT = 1e-9
+UNREACHABLE = -9999
+ARRAYS = ('node_ids', 'indptr', 'indices', 'weights', 'edge_ids', 'edge_lengths')
+
+class CSRGraph:
+    """
+    Graphe compilé en tableaux CSR (indptr / indices / longueurs).
+    Chaque arête du graphe (arêtes parallèles comprises) a un identifiant entier dense :
+    edge_lengths[id] ; dans le CSR, seule l'arête parallèle la plus courte est gardée,
+    comme le fait nx.shortest_path(weight='length'), et edge_ids donne son identifiant.
+    """
+
+    def __init__(self, node_ids, indptr, indices, weights, edge_ids, edge_lengths):
+        self.node_ids = node_ids
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        self.edge_ids = edge_ids
+        self.edge_lengths = edge_lengths
+        self._index = None
+        n = len(node_ids)
+        # copy=False : les tableaux (éventuellement memory-mappés) ne sont pas dupliqués
+        self.matrix = csr_matrix((weights, indices, indptr), shape=(n, n), copy=False)
+
+    @property
+    def index(self):
+        """nœud OSM -> position, construit à la demande (inutile dans les processus de calcul)."""
+        if self._index is None:
+            self._index = {node: i for i, node in enumerate(self.node_ids.tolist())}
+        return self._index
+
+    @property
+    def edge_count(self):
+        """Nombre d'arêtes du graphe, parallèles comprises (taille des tableaux d'usage)."""
+        return len(self.edge_lengths)
+
+    def save(self, directory):
+        """Écrit les tableaux CSR en .npy, relisibles en memory-map par plusieurs processus."""
+        os.makedirs(directory, exist_ok=True)
+        for name in ARRAYS:
+            tmp = os.path.join(directory, f"{name}.tmp.npy")
+            np.save(tmp, getattr(self, name))
+            os.replace(tmp, os.path.join(directory, f"{name}.npy"))
+
+    @classmethod
+    def load(cls, directory, mmap_mode="r"):
+        return cls(*(np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode) for name in ARRAYS))
+
+    def edge_positions(self, path):
+        """Position CSR de chaque segment (u, v) d'un chemin exprimé en positions de nœuds."""
+        u, v = path[:-1], path[1:]
+        positions = self.indptr[u].astype(np.int64)
+        # Quelques voisins par nœud : on avance dans chaque ligne jusqu'à trouver v
+        todo = np.flatnonzero(self.indices[positions] != v)
+        while len(todo):
+            positions[todo] += 1
+            todo = todo[self.indices[positions[todo]] != v[todo]]
+        return positions
+
+    def path_edges(self, path):
+        """Identifiants des arêtes empruntées par un chemin exprimé en positions de nœuds."""
+        if len(path) < 2:
+            return np.empty(0, dtype=np.int32)
+        return self.edge_ids[self.edge_positions(path)]
+
+    @classmethod
+    def from_networkx(cls, G, weight='length'):
+        node_ids = np.fromiter(G.nodes, dtype=np.int64, count=G.number_of_nodes())
+        index = {node: i for i, node in enumerate(node_ids.tolist())}
+        u, v, length = zip(*((index[a], index[b], data.get(weight, 1.0)) for a, b, data in G.edges(data=True)))
+        indptr, indices, weights, kept = compile_edges(len(node_ids), u, v, length)
+        return cls(node_ids, indptr, indices, weights, kept.astype(np.int32), np.asarray(length, dtype=np.float64))
+
+def compile_edges(n, u, v, length):
+    """
+    Tableaux CSR (indptr, indices, longueurs) d'une liste d'arêtes en positions de nœuds,
+    plus la position d'origine de chaque arête gardée (la plus courte de chaque couple).
+    """
+    u = np.asarray(u, dtype=np.int32)
+    v = np.asarray(v, dtype=np.int32)
+    length = np.maximum(np.asarray(length, dtype=np.float64), MIN_WEIGHT)
+
+    # Tri par (u, v, longueur) : la première arête de chaque couple est la plus courte
+    order = np.lexsort((length, v, u))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = (u[order][1:] != u[order][:-1]) | (v[order][1:] != v[order][:-1])
+    kept = order[first]
+
+    # Indices en int32 : le format attendu par csgraph, sans conversion (ni copie)
+    indptr = np.zeros(n + 1, dtype=np.int32)
+    np.cumsum(np.bincount(u[kept], minlength=n), out=indptr[1:])
+    return indptr, v[kept], length[kept], kept
+
+def _walk_back(predecessors, origin, dest):
+    """Reconstitue le chemin origine -> destination depuis l'arbre des prédécesseurs."""
+    if origin == dest:
+        return [origin]
+    if predecessors[dest] == UNREACHABLE:
+        return None
+    path = [dest]
+    while path[-1] != origin:
+        path.append(predecessors[path[-1]])
+    path.reverse()
+    return path
+
+def _route_groups(graph, groups, router=None):
+    """
+    groups = [(origine, [destinations], [nombres de trajets])], en positions de nœuds :
+    un arbre de plus courts chemins par origine, ou une recherche guidée par couple si
+    un moteur (A*, ALT) est donné. Renvoie les chemins (identifiants d'arêtes) et l'usage
+    partiel de chaque arête.
+    """
+    routes = {}
+    segments, weights = [], []
+    for source, dests, counts in groups:
+        if router is None:
+            _, predecessors = dijkstra(graph.matrix, indices=source, return_predecessors=True)
+        for dest, count in zip(dests, counts):
+            path = _walk_back(predecessors, source, dest) if router is None else router.path(source, dest)
+            if path is None:
+                routes[(source, dest)] = None
+                continue
+            edges = graph.path_edges(np.asarray(path, dtype=np.int32))
+            routes[(source, dest)] = edges
+            segments.append(edges)
+            weights.append(np.full(len(edges), count, dtype=np.int64))
+    usage = np.zeros(graph.edge_count, dtype=np.int64)
+    if segments:
+        usage += np.bincount(np.concatenate(segments), np.concatenate(weights), minlength=graph.edge_count).astype(np.int64)
+    return routes, usage
+
+# Graphe partagé des processus de calcul (tableaux memory-mappés, pas de copie par processus)
+_worker_graph = None
+_worker_router = None
+
+def _attach(directory, engine):
+    global _worker_graph, _worker_router
+    _worker_graph = CSRGraph.load(directory)
+    _worker_router = make_router(engine, _worker_graph, directory)
+
+def _route_chunk(groups):
+    return _route_groups(_worker_graph, groups, _worker_router)
+
+def route_usage(graph, pairs, workers=1, directory=None, engine='dijkstra'):
+    """
+    Itinéraires et usage des arêtes pour {(nœud origine, nœud destination): nombre de trajets}.
+    engine : 'dijkstra' (un arbre par origine), 'astar' ou 'alt' (recherche guidée par couple,
+    données lues dans directory). Avec workers > 1, les origines sont réparties entre processus
+    qui relisent les tableaux CSR de directory (memory-map) ; leurs comptes partiels sont sommés.
+    Renvoie ({(orig, dest): identifiants des arêtes empruntées, ou None si inatteignable},
+    usage par identifiant d'arête).
+    """
+    by_origin = defaultdict(lambda: ([], []))
+    routes = {}
+    for (orig, dest), count in pairs.items():
+        if orig in graph.index and dest in graph.index:
+            dests, counts = by_origin[graph.index[orig]]
+            dests.append(graph.index[dest])
+            counts.append(count)
+        else:
+            routes[(orig, dest)] = None
+    groups = [(source, dests, counts) for source, (dests, counts) in by_origin.items()]
+
+    if (workers > 1 or engine != 'dijkstra') and directory is None:
+        raise ValueError("Le calcul parallèle ou guidé nécessite le graphe compilé sur disque (directory)")
+    # Construit aussi, une seule fois, la table des repères ALT avant de lancer les processus
+    router = make_router(engine, graph, directory)
+
+    if workers > 1 and len(groups) > 1:
+        # Quelques lots par processus pour équilibrer la charge
+        chunks = [groups[i::workers * 4] for i in range(min(len(groups), workers * 4))]
+        usage = np.zeros(graph.edge_count, dtype=np.int64)
+        partial_routes = {}
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach, initargs=(directory, engine)) as pool:
+            for chunk_routes, chunk_usage in pool.map(_route_chunk, chunks):
+                partial_routes.update(chunk_routes)
+                usage += chunk_usage
+    else:
+        partial_routes, usage = _route_groups(graph, groups, router)
+
+    for (source, dest), path in partial_routes.items():
+        routes[(int(graph.node_ids[source]), int(graph.node_ids[dest]))] = path
+    return routes, usage
+
+def route_pairs(graph, pairs):
+    """
+    Itinéraires de plusieurs couples (nœud origine, nœud destination) :
+    un seul arbre de plus courts chemins par origine distincte.
+    Renvoie {(orig, dest): identifiants des arêtes empruntées, ou None si inatteignable}.
+    """
+    routes, _ = route_usage(graph, {pair: 1 for pair in pairs})
+    return routes
@@ -0,0 +1,54 @@
+import json
+import os
+import numpy as np
+
+from cache_utils import cache_path
+
+def build_index(snapshot):
+    """Index spatial (BallTree haversine) des nœuds du graphe (coordonnées WGS84), construit une seule fois."""
+    # Import différé : inutile quand toutes les stations sont déjà recalées
+    from sklearn.neighbors import BallTree
+    coords = np.column_stack([snapshot.lat, snapshot.lon])
+    return BallTree(np.radians(coords), metric="haversine"), snapshot.node_ids
+
+def snap(index, lats, lons):
+    """Nœud le plus proche de chaque point, en un seul appel vectorisé."""
+    tree, node_ids = index
+    points = np.radians(np.column_stack([lats, lons]))
+    _, nearest = tree.query(points, k=1)
+    return node_ids[nearest[:, 0]]
+
+def unique_stations(df):
+    """Stations distinctes (id, lat, lon) vues au départ ou à l'arrivée des trajets."""
+    starts = df[['departure', 'lat_start', 'lon_start']].to_numpy()
+    ends = df[['arrival', 'lat_end', 'lon_end']].to_numpy()
+    stations = np.concatenate([starts, ends])
+    _, first = np.unique(stations[:, 0], return_index=True)
+    return stations[first]
+
+def station_nodes(snapshot, df, graph_hash):
+    """
+    Correspondance station -> nœud du graphe, persistée dans cache/ par version de graphe.
+    Seules les stations nouvelles (ou déplacées) sont recalées.
+    """
+    path = cache_path(f"station_nodes-{graph_hash[:16]}.json")
+    known = {}
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            known = json.load(f)
+
+    stations = unique_stations(df)
+    missing = [
+        (int(sid), lat, lon) for sid, lat, lon in stations
+        if known.get(str(int(sid)), [None, None])[:2] != [round(lat, 6), round(lon, 6)]
+    ]
+    if missing:
+        print(f"📍 Recalage de {len(missing)} stations sur le graphe...")
+        ids, lats, lons = zip(*missing)
+        nodes = snap(build_index(snapshot), lats, lons)
+        for sid, lat, lon, node in zip(ids, lats, lons, nodes.tolist()):
+            known[str(sid)] = [round(lat, 6), round(lon, 6), node]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(known, f)
+
+    return {int(sid): node for sid, (_, _, node) in known.items()}
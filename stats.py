@@ -1,89 +1,13 @@
-import re
 import json
 
-def parse_stats_file(file_path):
-    """Parse le fichier de statistiques et extrait toutes les données"""
+STATS_VERSION = 1
+
+def load_stats(file_path):
+    """Charge le document structuré produit par analyze.py (statistiques.json)"""
     with open(file_path, "r", encoding="utf-8") as f:
-        content = f.read()
-    
-    stats = {}
-    
-    # Extraire les statistiques générales
-    stats['total_trips'] = int(re.search(r'Nombre total de trajets traités : (\d+)', content).group(1))
-    stats['total_bikes'] = int(re.search(r'Nombre total de vélos utilisés : (\d+)', content).group(1))
-    stats['electric_bikes'] = int(re.search(r'Vélos électriques.*: (\d+)', content).group(1))
-    stats['mechanical_bikes'] = int(re.search(r'Vélos mécaniques.*: (\d+)', content).group(1))
-    stats['electric_trips'] = int(re.search(r'Nombre de trajets électriques : (\d+)', content).group(1))
-    stats['mechanical_trips'] = int(re.search(r'Nombre de trajets mécaniques : (\d+)', content).group(1))
-    stats['boomerang_trips'] = int(re.search(r'Nombre de trajets boomerang.*: (\d+)', content).group(1))
-    stats['bonus_trips'] = int(re.search(r'Nombre de trajets avec bonus > 0 : (\d+)', content).group(1))
-    stats['bonus_minutes'] = float(re.search(r'Minutes bonus gagnées au total : ([\d.]+)', content).group(1))
-    
-    # Distance et vitesse
-    distance_m = float(re.search(r'Distance totale parcourue : ([\d.]+)', content).group(1))
-    stats['total_distance_km'] = round(distance_m / 1000, 0)
-    stats['avg_distance_km'] = float(re.search(r'Distance moyenne par trajet : ([\d.]+)', content).group(1))
-    stats['avg_duration_min'] = float(re.search(r'Durée moyenne d\'un trajet : ([\d.]+)', content).group(1))
-    stats['avg_speed_kmh'] = float(re.search(r'Vitesse moyenne globale : ([\d.]+)', content).group(1))
-    
-    # Top 10 stations
-    stations_section = re.search(r'Top 10 stations.*?:(.*?)(?=Top 10|$)', content, re.DOTALL).group(1)
-    stats['top_stations'] = []
-    for line in stations_section.strip().split('\n'):
-        if line.strip():
-            match = re.search(r'(.*?) \((\d+)\) : (\d+) passages', line)
-            if match:
-                stats['top_stations'].append({
-                    'name': match.group(1).strip(),
-                    'id': match.group(2),
-                    'count': int(match.group(3))
-                })
-    
-    # Top 10 trajets rapides
-    fast_section = re.search(r'Top 10 trajets les plus rapides.*?:(.*?)(?=Top 10|Nombre total)', content, re.DOTALL).group(1)
-    stats['fast_trips'] = []
-    for line in fast_section.strip().split('\n'):
-        if line.strip() and ' -> ' in line:
-            match = re.search(r'(.*?) -> (.*?) : ([\d.]+) km/h', line)
-            if match:
-                stats['fast_trips'].append({
-                    'from': match.group(1).strip(),
-                    'to': match.group(2).strip(),
-                    'speed': float(match.group(3))
-                })
-    
-    # Répartition des durées
-    duration_section = re.search(r'Répartition des durées.*?:(.*?)(?=Trajets par heure)', content, re.DOTALL).group(1)
-    stats['duration_distribution'] = {}
-    for line in duration_section.strip().split('\n'):
-        if line.strip():
-            if '<5 min' in line:
-                match = re.search(r'<5 min : \d+ trajets \(([\d.]+)%\)', line)
-                stats['duration_distribution']['<5min'] = float(match.group(1))
-            elif '5-10 min' in line:
-                match = re.search(r'5-10 min : \d+ trajets \(([\d.]+)%\)', line)
-                stats['duration_distribution']['5-10min'] = float(match.group(1))
-            elif '10-20 min' in line:
-                match = re.search(r'10-20 min : \d+ trajets \(([\d.]+)%\)', line)
-                stats['duration_distribution']['10-20min'] = float(match.group(1))
-            elif '20-30 min' in line:
-                match = re.search(r'20-30 min : \d+ trajets \(([\d.]+)%\)', line)
-                stats['duration_distribution']['20-30min'] = float(match.group(1))
-            elif '>30 min' in line:
-                match = re.search(r'>30 min : \d+ trajets \(([\d.]+)%\)', line)
-                stats['duration_distribution']['>30min'] = float(match.group(1))
-    
-    # Trajets par heure
-    hourly_section = re.search(r'Trajets par heure.*?:(.*?)(?=Trajets par jour|$)', content, re.DOTALL).group(1)
-    stats['hourly_trips'] = []
-    for line in hourly_section.strip().split('\n'):
-        if line.strip() and 'h : ' in line:
-            match = re.search(r'(\d+)h : (\d+) trajets', line)
-            if match:
-                hour = int(match.group(1))
-                trips = int(match.group(2))
-                stats['hourly_trips'].append({'hour': f'{hour:02d}h', 'trips': trips})
-    
+        stats = json.load(f)
+    if stats.get('version') != STATS_VERSION:
+        raise ValueError(f"version {stats.get('version')} de {file_path} non prise en charge (attendue : {STATS_VERSION})")
     return stats
 
 def generate_html(stats, output_path):
@@ -567,13 +491,13 @@ def generate_html(stats, output_path):
 
 def main():
     """Fonction principale"""
-    stats_file = "output/statistiques.txt"  # Chemin vers votre fichier de stats
+    stats_file = "output/statistiques.json"  # Statistiques produites par analyze.py
     output_file = "output/dashboard_stats.html"  # Fichier HTML de sortie
     
     try:
-        # Parser les statistiques
-        print("📊 Parsing des statistiques...")
-        stats = parse_stats_file(stats_file)
+        # Charger les statistiques
+        print("📊 Chargement des statistiques...")
+        stats = load_stats(stats_file)
         
         # Générer le HTML
         print("🚀 Génération du dashboard HTML...")
@@ -0,0 +1,48 @@
+import argparse
+import os
+import re
+import sqlite3
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from vector_tiles import TILES_FILE, read_tile
+
+TILE_PATH = re.compile(r"^/tiles/(\d+)/(\d+)/(\d+)\.pbf$")
+
+class TileHandler(SimpleHTTPRequestHandler):
+    """Sert les fichiers de output/ et les tuiles /tiles/z/x/y.pbf lues dans l'archive MBTiles."""
+
+    mbtiles = TILES_FILE
+
+    def do_GET(self):
+        match = TILE_PATH.match(self.path.split("?")[0])
+        if not match:
+            return super().do_GET()
+        # Une connexion par requête : le serveur traite les requêtes dans plusieurs threads
+        with sqlite3.connect(f"file:{self.mbtiles}?mode=ro", uri=True) as db:
+            data = read_tile(db, *map(int, match.groups()))
+        if data is None:
+            self.send_response(204)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-protobuf")
+        self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Cache-Control", "max-age=3600")
+        self.end_headers()
+        self.wfile.write(data)
+
+def main():
+    parser = argparse.ArgumentParser(description="Serveur local de la carte en mode tuiles vectorielles")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--mbtiles", default=TILES_FILE)
+    args = parser.parse_args()
+
+    TileHandler.mbtiles = os.path.abspath(args.mbtiles)
+    handler = partial(TileHandler, directory=os.path.dirname(TileHandler.mbtiles))
+    print(f"🌍 Carte disponible sur http://localhost:{args.port}/carte_interactive.html (Ctrl+C pour arrêter)")
+    ThreadingHTTPServer(("", args.port), handler).serve_forever()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import numpy as np
+from scipy.sparse import coo_matrix
+
+ROUTES_FILE = "data/trip_routes.npz"
+
+class TripRoutes:
+    """
+    Itinéraire de chaque trajet, en tableau irrégulier : identifiants d'arêtes bout à bout
+    (edges, int32) et bornes par trajet (offsets) ; le trajet i de trajets.npy emprunte
+    edges[offsets[i]:offsets[i + 1]]. Les identifiants sont ceux du graphe graph_hash.
+    """
+
+    def __init__(self, edges, offsets, graph_hash):
+        self.edges = edges
+        self.offsets = offsets
+        self.graph_hash = graph_hash
+
+    @classmethod
+    def from_routes(cls, rows, routes, trip_count, graph_hash):
+        """routes[k] : itinéraire de la ligne rows[k] ; les autres lignes ont un itinéraire vide."""
+        lengths = np.zeros(trip_count, dtype=np.int64)
+        lengths[rows] = [len(route) for route in routes]
+        offsets = np.zeros(trip_count + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        # Les itinéraires sont rangés dans l'ordre des lignes
+        order = np.argsort(rows, kind="stable")
+        edges = np.concatenate([routes[k] for k in order.tolist()] + [np.empty(0, dtype=np.int32)]).astype(np.int32)
+        return cls(edges, offsets, graph_hash)
+
+    def save(self, path=ROUTES_FILE):
+        np.savez(path, edges=self.edges, offsets=self.offsets, graph_hash=np.array(self.graph_hash))
+
+    @classmethod
+    def load(cls, path=ROUTES_FILE):
+        with np.load(path) as f:
+            return cls(f['edges'], f['offsets'], str(f['graph_hash']))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def route(self, trip):
+        return self.edges[self.offsets[trip]:self.offsets[trip + 1]]
+
+    def segment_trips(self):
+        """Trajet de chaque élément de edges."""
+        return np.repeat(np.arange(len(self)), np.diff(self.offsets))
+
+    def lengths(self, edge_lengths):
+        """Longueur routée de chaque trajet (mètres), à partir des longueurs par arête du graphe compilé."""
+        return np.bincount(self.segment_trips(), weights=np.asarray(edge_lengths)[self.edges], minlength=len(self))
+
+    def trips_using(self, edge_ids):
+        """Trajets dont l'itinéraire emprunte au moins une des arêtes données."""
+        return np.unique(self.segment_trips()[np.isin(self.edges, edge_ids)])
+
+    def usage(self, edge_count, trips=None):
+        """
+        Passages par arête, pour tous les trajets ou une sélection (masque booléen ou indices),
+        ex. : trips=table['start'] >= np.datetime64('2024-01-01').
+        """
+        if trips is None:
+            return np.bincount(self.edges, minlength=edge_count)
+        selected = np.zeros(len(self), dtype=bool)
+        selected[trips] = True
+        return np.bincount(self.edges[np.repeat(selected, np.diff(self.offsets))], minlength=edge_count)
+
+    def group_usage(self, groups, group_count, edge_count):
+        """Passages par arête et par groupe (groups[i] : groupe du trajet i, -1 pour l'ignorer), en matrice creuse."""
+        segment_groups = np.asarray(groups)[self.segment_trips()]
+        kept = segment_groups >= 0
+        return coo_matrix((np.ones(int(kept.sum()), dtype=np.int32), (self.edges[kept], segment_groups[kept])),
+                          shape=(edge_count, group_count)).tocsr()
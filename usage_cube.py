@@ -0,0 +1,86 @@
+import numpy as np
+from scipy.sparse import csr_matrix
+
+CUBE_FILE = "data/usage_cube.npz"
+HOURS = 24
+WEEKDAYS = 7
+# Colonnes : (mois, jour de la semaine, heure) -> mois * 168 + jour * 24 + heure
+MONTH_WIDTH = WEEKDAYS * HOURS
+
+def time_buckets(starts):
+    """
+    Mois (datetime64[M]), jour de la semaine (lundi = 0) et heure de chaque départ,
+    dans l'heure de la table des trajets (comme les statistiques d'analyze.py).
+    """
+    day = starts.astype("datetime64[D]")
+    hours = (starts - day).astype("timedelta64[h]").astype(np.int64)
+    # Le 1er janvier 1970 était un jeudi
+    weekdays = (day.astype(np.int64) + 3) % 7
+    return starts.astype("datetime64[M]"), weekdays, hours
+
+class UsageCube:
+    """
+    Passages par arête et par créneau : matrice creuse (arêtes x colonnes) où chaque
+    colonne est un (mois, jour de la semaine, heure). Un filtre temporel se résume à
+    sommer les colonnes retenues, sans recalculer d'itinéraire.
+    """
+
+    def __init__(self, matrix, months):
+        self.matrix = matrix
+        self.months = months
+
+    @classmethod
+    def build(cls, trip_routes, starts, edge_count):
+        """trip_routes : itinéraires par trajet (TripRoutes) ; starts : date de départ de chaque trajet."""
+        valid = ~np.isnat(starts)
+        month, weekday, hour = time_buckets(starts[valid])
+        months, month_rank = np.unique(month, return_inverse=True)
+        # Colonne de chaque trajet ; -1 : trajet sans date, laissé hors du cube
+        columns = np.full(len(starts), -1, dtype=np.int64)
+        columns[valid] = month_rank * MONTH_WIDTH + weekday * HOURS + hour
+        return cls(trip_routes.group_usage(columns, len(months) * MONTH_WIDTH, edge_count), months)
+
+    def save(self, path=CUBE_FILE):
+        np.savez_compressed(path, data=self.matrix.data, indices=self.matrix.indices, indptr=self.matrix.indptr,
+                            shape=np.array(self.matrix.shape), months=self.months.astype(str))
+
+    @classmethod
+    def load(cls, path=CUBE_FILE):
+        with np.load(path) as f:
+            matrix = csr_matrix((f['data'], f['indices'], f['indptr']), shape=tuple(f['shape']))
+            return cls(matrix, f['months'].astype("datetime64[M]"))
+
+    def columns(self, months=None, weekdays=None, hours=None):
+        """Colonnes d'un filtre : mois ('2024-05', ou une année '2024'), jours (0 = lundi), heures."""
+        month_mask = np.ones(len(self.months), dtype=bool)
+        if months is not None:
+            wanted = [np.datetime64(m) for m in ([months] if isinstance(months, str) else months)]
+            month_mask = np.zeros(len(self.months), dtype=bool)
+            for m in wanted:
+                month_mask |= self.months.astype(f"datetime64[{np.datetime_data(m.dtype)[0]}]") == m
+        weekdays = np.arange(WEEKDAYS) if weekdays is None else np.asarray(weekdays)
+        hours = np.arange(HOURS) if hours is None else np.asarray(hours)
+        ranks = np.flatnonzero(month_mask)
+        return (ranks[:, None, None] * MONTH_WIDTH + weekdays[None, :, None] * HOURS + hours[None, None, :]).ravel()
+
+    def usage(self, months=None, weekdays=None, hours=None):
+        """Passages par arête pour un filtre temporel (vecteur de la taille du graphe)."""
+        return np.asarray(self.matrix[:, self.columns(months, weekdays, hours)].sum(axis=1)).ravel()
+
+    def by_hour(self):
+        """Passages (arêtes x 24 heures), tous mois et jours confondus (matrice creuse)."""
+        return self._fold(np.arange(self.matrix.shape[1]) % HOURS, HOURS)
+
+    def by_weekday(self):
+        """Passages (arêtes x 7 jours, lundi = 0)."""
+        return self._fold(np.arange(self.matrix.shape[1]) // HOURS % WEEKDAYS, WEEKDAYS)
+
+    def by_month(self):
+        """Passages (arêtes x mois), mois dans self.months."""
+        return self._fold(np.arange(self.matrix.shape[1]) // MONTH_WIDTH, len(self.months))
+
+    def _fold(self, groups, size):
+        # Produit par une matrice 0/1 colonne -> groupe : le résultat reste creux
+        n = self.matrix.shape[1]
+        fold = csr_matrix((np.ones(n, dtype=np.int64), (np.arange(n), groups)), shape=(n, size))
+        return (self.matrix @ fold).tocsr()
@@ -0,0 +1,119 @@
+import gzip
+import json
+import multiprocessing
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+
+import mapbox_vector_tile
+import numpy as np
+import shapely
+from pandas.api.types import is_numeric_dtype
+from shapely import STRtree
+
+TILES_FILE = "output/trajets.mbtiles"
+LAYER = "trajets"
+EXTENT = 4096
+# Marge autour de chaque tuile (en unités de tuile) pour éviter les coupures visibles aux bords
+BUFFER = 64
+MIN_ZOOM, MAX_ZOOM = 10, 16
+HALF_WORLD = 20037508.342789244  # demi-circonférence en Web Mercator (EPSG:3857)
+
+def tile_bounds(z, x, y):
+    """(minx, miny, maxx, maxy) de la tuile z/x/y, en mètres Web Mercator."""
+    size = 2 * HALF_WORLD / 2 ** z
+    return -HALF_WORLD + x * size, HALF_WORLD - (y + 1) * size, -HALF_WORLD + (x + 1) * size, HALF_WORLD - y * size
+
+def tiles_for(tree, z):
+    """Tuiles du niveau z qui contiennent au moins un segment (une seule requête groupée sur l'index)."""
+    size = 2 * HALF_WORLD / 2 ** z
+    minx, miny, maxx, maxy = shapely.total_bounds(tree.geometries)
+    xs = range(int((minx + HALF_WORLD) // size), int((maxx + HALF_WORLD) // size) + 1)
+    ys = range(int((HALF_WORLD - maxy) // size), int((HALF_WORLD - miny) // size) + 1)
+    candidates = [(x, y) for x in xs for y in ys]
+    boxes = shapely.box(*np.array([tile_bounds(z, x, y) for x, y in candidates]).T)
+    hit = np.unique(tree.query(boxes)[0])
+    return [(z, *candidates[i]) for i in hit.tolist()]
+
+# Données partagées des processus de génération (géométries simplifiées par zoom, index, propriétés)
+_layers = None
+_trees = {}
+
+def _attach(layers):
+    global _layers
+    _layers = layers
+
+def _render(tile):
+    """Tuile MVT compressée (gzip, comme l'exige MBTiles), ou None si elle est vide."""
+    z, x, y = tile
+    geometries, properties = _layers[z], _layers['properties']
+    tree = _trees.get(z) or _trees.setdefault(z, STRtree(geometries))
+    minx, miny, maxx, maxy = tile_bounds(z, x, y)
+    margin = (maxx - minx) * BUFFER / EXTENT
+    found = tree.query(shapely.box(minx - margin, miny - margin, maxx + margin, maxy + margin))
+    clipped = shapely.clip_by_rect(geometries[found], minx - margin, miny - margin, maxx + margin, maxy + margin)
+    features = [
+        {'geometry': geometry, 'properties': {name: values[i] for name, values in properties.items()}}
+        for i, geometry in zip(found.tolist(), clipped) if not geometry.is_empty
+    ]
+    if not features:
+        return tile, None
+    data = mapbox_vector_tile.encode([{'name': LAYER, 'features': features}],
+                                     default_options={'quantize_bounds': (minx, miny, maxx, maxy), 'extents': EXTENT})
+    return tile, gzip.compress(data)
+
+def _write_mbtiles(path, tiles, gdf, properties, minzoom, maxzoom):
+    tmp = path + ".tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    db = sqlite3.connect(tmp)
+    db.execute("CREATE TABLE metadata (name TEXT, value TEXT)")
+    db.execute("CREATE TABLE tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB)")
+    db.execute("CREATE UNIQUE INDEX tile_index ON tiles (zoom_level, tile_column, tile_row)")
+    # MBTiles numérote les lignes depuis le sud (schéma TMS)
+    db.executemany("INSERT INTO tiles VALUES (?, ?, ?, ?)",
+                   ((z, x, 2 ** z - 1 - y, data) for (z, x, y), data in tiles))
+    west, south, east, north = gdf.to_crs(epsg=4326).total_bounds
+    fields = {name: "Number" if is_numeric_dtype(gdf[name]) else "String" for name in properties}
+    metadata = {
+        'name': LAYER, 'format': "pbf", 'minzoom': minzoom, 'maxzoom': maxzoom,
+        'bounds': f"{west},{south},{east},{north}",
+        'center': f"{(west + east) / 2},{(south + north) / 2},{minzoom}",
+        'json': json.dumps({'vector_layers': [{'id': LAYER, 'fields': fields, 'minzoom': minzoom, 'maxzoom': maxzoom}]}),
+    }
+    db.executemany("INSERT INTO metadata VALUES (?, ?)", ((k, str(v)) for k, v in metadata.items()))
+    db.commit()
+    db.close()
+    os.replace(tmp, path)
+
+def build_mbtiles(gdf, path=TILES_FILE, properties=('count',), minzoom=MIN_ZOOM, maxzoom=MAX_ZOOM, workers=None):
+    """
+    Découpe une couche de lignes (GeoDataFrame) en tuiles vectorielles z/x/y rangées
+    dans une archive MBTiles. Chaque niveau est simplifié à un pixel de tuile près ;
+    les tuiles sont générées en parallèle.
+    """
+    gdf = gdf.to_crs(epsg=3857)
+    geometries = np.asarray(gdf.geometry.values)
+    layers = {'properties': {name: gdf[name].tolist() for name in properties}}
+    for z in range(minzoom, maxzoom + 1):
+        layers[z] = shapely.simplify(geometries, 2 * HALF_WORLD / 2 ** z / EXTENT)
+
+    tiles = [tile for z in range(minzoom, maxzoom + 1) for tile in tiles_for(STRtree(layers[z]), z)]
+    workers = workers or os.cpu_count()
+    # web-maker.py est un script sans garde __main__ : sans fork, les processus le réexécuteraient
+    if workers > 1 and "fork" in multiprocessing.get_all_start_methods():
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork"),
+                                 initializer=_attach, initargs=(layers,)) as pool:
+            results = list(pool.map(_render, tiles, chunksize=max(1, len(tiles) // (workers * 4))))
+    else:
+        _attach(layers)
+        results = [_render(tile) for tile in tiles]
+    rendered = [(tile, data) for tile, data in results if data is not None]
+    _write_mbtiles(path, rendered, gdf, properties, minzoom, maxzoom)
+    return len(rendered)
+
+def read_tile(db, z, x, y):
+    """Tuile z/x/y (numérotation XYZ de Leaflet) d'une archive MBTiles ouverte, ou None."""
+    row = db.execute("SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+                     (z, x, 2 ** z - 1 - y)).fetchone()
+    return row[0] if row else None
@@ -1,31 +1,45 @@
+import argparse
+import json
 import folium
 import geopandas as gpd
 import pandas as pd
 import branca.colormap as cm
-from folium.plugins import Fullscreen, MiniMap, MousePosition, MarkerCluster
+from folium.plugins import Fullscreen, MiniMap, MousePosition, FastMarkerCluster, VectorGridProtobuf
 from folium import Html
 
+from quartier_usage import QUARTIERS_FILE, for_trajects
+
+parser = argparse.ArgumentParser(description="Carte interactive des trajets Vélib'")
+parser.add_argument("--mode", choices=["geojson", "tiles", "canvas"], default="geojson",
+                    help="Trajets intégrés à la page (geojson), tuiles vectorielles servies par tile_server.py (tiles) "
+                         "ou dessinés sur canvas depuis des tableaux typés (canvas, pour les très grandes couches)")
+parser.add_argument("--workers", type=int, default=None, help="Processus de génération des tuiles (mode tiles)")
+parser.add_argument("--lod", action="store_true",
+                    help="Géométries simplifiées et quantifiées par bande de zoom (TopoJSON, mises en cache)")
+args = parser.parse_args()
+
 # === 1. Charger les trajets et reprojeter ===
 gdf = gpd.read_file("data/trajects.geojson")
 gdf = gdf.to_crs(epsg=3857)  # Pour calculer les longueurs en mètres
 gdf["km"] = gdf.length / 1000  # Longueur en km
 
-# === 2. Statistiques générales depuis un fichier texte ===
-with open("output/statistiques.txt", "r", encoding="utf-8") as f:
-    stats_content = f.read().replace("\n", "<br>")  # Pour affichage HTML
+# === 2. Statistiques générales (document produit par analyze.py) ===
+with open("output/statistiques.json", "r", encoding="utf-8") as f:
+    stats = json.load(f)
 
 # === 3. Charger les stations Velib ===
 df_stations = pd.read_csv("ressources/velib-emplacement-des-stations.csv", sep=";")
 df_stations[['lat', 'lon']] = df_stations['Coordonnées géographiques'].str.split(',', expand=True).astype(float)
 
-# === 4. Charger quartiers et reprojeter ===
-quartiers = gpd.read_file("ressources/quartiers.geojson")
+# === 4. Charger quartiers : trajets et km parcourus par quartier ===
+# Arêtes découpées aux contours une fois pour toutes (en cache avec le graphe compilé),
+# puis simple produit matrice creuse - vecteur de passages
+quartiers = gpd.read_file(QUARTIERS_FILE)
+assignment, usage = for_trajects(gdf, quartiers)
+quartiers['total_trajets'] = assignment.trips(usage).round(1)
+quartiers['km_parcourus'] = assignment.km(usage).round(1)
 quartiers = quartiers.to_crs(epsg=3857)
 
-joined = gpd.sjoin(quartiers, gdf, how="left", predicate="intersects")
-trajets_par_quartier = joined.groupby(joined.index).agg({'count': 'sum'}).fillna(0)
-quartiers['total_trajets'] = trajets_par_quartier['count']
-
 # === 5. Palette de couleurs pour quartiers ===
 vmin = quartiers['total_trajets'].min()
 vmax = quartiers['total_trajets'].max()
@@ -66,11 +80,23 @@ def style_quartiers(feature):
     }
 
 quartiers_layer = folium.FeatureGroup(name="Quartiers par fréquentation", show=False)
-folium.GeoJson(
-    quartiers.to_crs(epsg=4326),
-    style_function=style_quartiers,
-    tooltip=folium.GeoJsonTooltip(fields=['l_qu', 'total_trajets'], aliases=['Quartier', 'Total trajets']),
-).add_to(quartiers_layer)
+if args.lod:
+    # Une version par bande de zoom : frontières communes stockées une seule fois, coordonnées entières
+    from map_lod import add_banded_layers, topologies
+    add_banded_layers(
+        quartiers_layer, m,
+        topologies({'quartiers': quartiers}, {'quartiers': ['l_qu', 'total_trajets', 'km_parcourus']}),
+        "quartiers", style_quartiers,
+        tooltip=lambda: folium.GeoJsonTooltip(fields=['l_qu', 'total_trajets', 'km_parcourus'],
+                                              aliases=['Quartier', 'Total trajets', 'Km parcourus']),
+    )
+else:
+    folium.GeoJson(
+        quartiers.to_crs(epsg=4326),
+        style_function=style_quartiers,
+        tooltip=folium.GeoJsonTooltip(fields=['l_qu', 'total_trajets', 'km_parcourus'],
+                                      aliases=['Quartier', 'Total trajets', 'Km parcourus']),
+    ).add_to(quartiers_layer)
 quartiers_layer.add_to(m)
 colormap_quartiers.add_to(m)
 
@@ -88,51 +114,107 @@ def style_function(feature):
 colormap_trajets.add_to(m)
 
 # === 10. Ajouter trajets ===
-folium.GeoJson(
-    data=gdf.to_crs(epsg=4326),
-    style_function=style_function,
-    tooltip=folium.GeoJsonTooltip(
+if args.mode == "tiles":
+    # Tuiles vectorielles (MBTiles) : le navigateur ne charge que les tuiles visibles.
+    # Couleur et épaisseur sont calculées ici et portées par chaque segment des tuiles.
+    from vector_tiles import TILES_FILE, MAX_ZOOM, build_mbtiles
+    gdf["color"] = [colormap_trajets(count) for count in gdf["count"]]
+    gdf["weight"] = 2 + gdf["count"] / max_count * 6
+    n_tiles = build_mbtiles(gdf, TILES_FILE, properties=("count", "km", "color", "weight"), workers=args.workers)
+    print(f"🧩 {n_tiles} tuiles vectorielles enregistrées dans '{TILES_FILE}'")
+    VectorGridProtobuf(
+        "tiles/{z}/{x}/{y}.pbf",
+        "Trajets Velib",
+        """{
+            "maxNativeZoom": %d,
+            "interactive": true,
+            "vectorTileLayerStyles": {
+                "trajets": function(p) {
+                    return {color: p.color, weight: p.weight, opacity: 0.85, lineCap: 'round'};
+                }
+            }
+        }""" % MAX_ZOOM,
+    ).add_to(m)
+elif args.mode == "canvas":
+    # Couleur et épaisseur calculées ici, par paliers : les segments de même style sont tracés ensemble
+    from canvas_layer import CanvasLines
+    paliers = colormap_trajets.to_step(32)
+    CanvasLines(
+        gdf,
+        colors=[paliers(count) for count in gdf["count"]],
+        widths=(2 + gdf["count"] / max_count * 6).round(1),
         fields=['count', 'km'],
         aliases=['Nombre de trajets', 'Longueur (km)'],
-        sticky=True
-    ),
-    popup=folium.GeoJsonPopup(
-        fields=['count', 'km'],
-        aliases=['Nombre de trajets', 'Longueur (km)'],
-        max_width=300
-    ),
-    name="Trajets Velib"
-).add_to(m)
+        name="Trajets Velib",
+    ).add_to(m)
+elif args.lod:
+    trajets_layer = folium.FeatureGroup(name="Trajets Velib").add_to(m)
+    add_banded_layers(
+        trajets_layer, m, topologies({'trajets': gdf}, {'trajets': ['count', 'km']}), "trajets", style_function,
+        tooltip=lambda: folium.GeoJsonTooltip(fields=['count', 'km'], aliases=['Nombre de trajets', 'Longueur (km)'],
+                                              sticky=True),
+        popup=lambda: folium.GeoJsonPopup(fields=['count', 'km'], aliases=['Nombre de trajets', 'Longueur (km)'],
+                                          max_width=300),
+    )
+else:
+    folium.GeoJson(
+        data=gdf.to_crs(epsg=4326),
+        style_function=style_function,
+        tooltip=folium.GeoJsonTooltip(
+            fields=['count', 'km'],
+            aliases=['Nombre de trajets', 'Longueur (km)'],
+            sticky=True
+        ),
+        popup=folium.GeoJsonPopup(
+            fields=['count', 'km'],
+            aliases=['Nombre de trajets', 'Longueur (km)'],
+            max_width=300
+        ),
+        name="Trajets Velib"
+    ).add_to(m)
 
 # === 11. Stations Velib avec cluster ===
+# Un seul tableau compact [lat, lon, nom, capacité, id] : marqueurs (cercles sur canvas),
+# regroupement et popups sont créés dans le navigateur, sans boucle Python par station.
 stations_layer = folium.FeatureGroup(name="Stations Velib", show=True)
-marker_cluster = MarkerCluster(name="Clusters stations").add_to(stations_layer)
-
-for _, row in df_stations.iterrows():
-    popup_html = f"""
-    <b>{row['Nom de la station']}</b><br>
-    Capacité : {row['Capacité de la station']} vélos<br>
-    ID station : {row['Identifiant station']}
-    """
-    folium.CircleMarker(
-        location=[row['lat'], row['lon']],
-        radius=4,
-        color="#d36e70",
-        fill=True,
-        fill_color="#d36e70",
-        fill_opacity=0.8,
-        popup=folium.Popup(popup_html, max_width=250),
-        tooltip=row['Nom de la station'],
-    ).add_to(marker_cluster)
+stations_data = list(zip(
+    df_stations['lat'].round(5).tolist(),
+    df_stations['lon'].round(5).tolist(),
+    df_stations['Nom de la station'].tolist(),
+    df_stations['Capacité de la station'].tolist(),
+    df_stations['Identifiant station'].tolist(),
+))
+stations_callback = """
+(function () {
+    var renderer = L.canvas({padding: 0.5});
+    var escape = function (text) {
+        var div = document.createElement('div');
+        div.textContent = text;
+        return div.innerHTML;
+    };
+    return function (row) {
+        var marker = L.circleMarker([row[0], row[1]], {
+            renderer: renderer, radius: 4, color: '#d36e70', fill: true, fillColor: '#d36e70', fillOpacity: 0.8
+        });
+        marker.bindTooltip(escape(row[2]));
+        // Popup construit seulement à l'ouverture
+        marker.bindPopup(function () {
+            return '<b>' + escape(row[2]) + '</b><br>Capacité : ' + row[3] + ' vélos<br>ID station : ' + row[4];
+        }, {maxWidth: 250});
+        return marker;
+    };
+})();
+"""
+FastMarkerCluster(stations_data, callback=stations_callback, name="Clusters stations").add_to(stations_layer)
 
 stations_layer.add_to(m)
 
-# === 12. Panneau statique avec le contenu brut du fichier ===
-html_content = """
+# === 12. Panneau statique avec le résumé des statistiques ===
+html_content = f"""
 <div style='font-family: Arial; font-size: 14px; padding: 10px;'>
     <h4>📊 Statistiques</h4>
-    <p>Trajet total, plus long trajet, stations les plus utilisées, etc.</p>
-    <a href="stats.html" target="_blank" style='
+    <p>{stats['total_trips']} trajets, {stats['total_distance_km']:.0f} km parcourus, {stats['avg_speed_kmh']:.1f} km/h en moyenne.</p>
+    <a href="dashboard_stats.html" target="_blank" style='
         display: inline-block;
         padding: 10px 16px;
         background-color: #6a0dad;
@@ -159,3 +241,5 @@ folium.LayerControl(position='topright').add_to(m)
 # === 14. Export final ===
 m.save("output/carte_interactive.html")
 print("✅ Carte enregistrée dans 'carte_interactive.html'")
+if args.mode == "tiles":
+    print("🌍 Lancer 'python3 tile_server.py' puis ouvrir http://localhost:8000/carte_interactive.html")